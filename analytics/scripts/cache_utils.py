@@ -0,0 +1,129 @@
+import hashlib
+import pickle
+import sqlite3
+
+# Fixed protocol so that content hashes stay stable between Python versions
+PICKLE_PROTOCOL = 4
+
+# Sessions buffered before they are written in one short transaction
+PUTS_PER_COMMIT = 32
+
+
+def content_hash(obj):
+    """Hash of a session subtree (a change in key order only causes a cache miss)."""
+    return hashlib.sha256(pickle.dumps(obj, protocol=PICKLE_PROTOCOL)).hexdigest()
+
+
+def file_hash(file_path, chunk_size=1 << 20):
+    """Hash of an export file's bytes; much cheaper than parsing it."""
+    sha = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def source_hash(*file_paths):
+    """Hash of source files, so that editing the extraction code invalidates the cache."""
+    sha = hashlib.sha256()
+    for file_path in file_paths:
+        with open(file_path, "rb") as f:
+            sha.update(f.read())
+    return sha.hexdigest()[:16]
+
+
+class SessionCache:
+    """Persistent per-session extraction results in a SQLite file.
+
+    Entries are keyed by session id and the content hash of the session
+    subtree, so a session is only re-extracted when it is new or changed.
+    For every export the ordered list of its sessions is stored as well,
+    which lets an unchanged export be served without parsing it at all.
+    Several worker processes may share one cache file: new entries are
+    buffered and written in one transaction per PUTS_PER_COMMIT sessions and
+    per export, so the write lock is never held while sessions are extracted.
+    """
+
+    def __init__(self, path, namespace):
+        self.namespace = namespace
+        self.sessions = []  # (session_id, content_hash) looked up since opening, in order
+        self._pending = {}  # session_id -> (content_hash, pickled payload) not written yet
+        self._connection = sqlite3.connect(path, timeout=60)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "namespace TEXT, session_id TEXT, content_hash TEXT, payload BLOB, "
+            "PRIMARY KEY (namespace, session_id))"
+        )
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS exports ("
+            "namespace TEXT, export_hash TEXT, sessions BLOB, "
+            "PRIMARY KEY (namespace, export_hash))"
+        )
+
+    def _load(self, session_id, session_hash):
+        if session_id in self._pending:
+            pending_hash, payload = self._pending[session_id]
+            return pickle.loads(payload) if pending_hash == session_hash else None
+        row = self._connection.execute(
+            "SELECT payload FROM sessions WHERE namespace = ? AND session_id = ? AND content_hash = ?",
+            (self.namespace, session_id, session_hash),
+        ).fetchone()
+        return pickle.loads(row[0]) if row else None
+
+    def get(self, session_id, session_hash):
+        """Return the cached payload of a session, or None if it is new or changed."""
+        self.sessions.append((session_id, session_hash))
+        return self._load(session_id, session_hash)
+
+    def put(self, session_id, session_hash, payload):
+        self._pending[session_id] = (session_hash, pickle.dumps(payload, protocol=PICKLE_PROTOCOL))
+        if len(self._pending) >= PUTS_PER_COMMIT:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered sessions in one transaction."""
+        if self._pending:
+            with self._connection:
+                self._connection.executemany(
+                    "INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?)",
+                    [(self.namespace, session_id, session_hash, payload)
+                     for session_id, (session_hash, payload) in self._pending.items()],
+                )
+            self._pending.clear()
+
+    def get_export(self, export_hash):
+        """Return [(session_id, payload), ...] of an unchanged export, or None if anything is missing."""
+        row = self._connection.execute(
+            "SELECT sessions FROM exports WHERE namespace = ? AND export_hash = ?",
+            (self.namespace, export_hash),
+        ).fetchone()
+        if row is None:
+            return None
+
+        payloads = []
+        for session_id, session_hash in pickle.loads(row[0]):
+            payload = self._load(session_id, session_hash)
+            if payload is None:
+                return None
+            payloads.append((session_id, payload))
+        return payloads
+
+    def put_export(self, export_hash):
+        """Record the sessions looked up since opening as the content of an export."""
+        self.flush()
+        with self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO exports VALUES (?, ?, ?)",
+                (self.namespace, export_hash, pickle.dumps(self.sessions, protocol=PICKLE_PROTOCOL)),
+            )
+
+    def close(self):
+        self.flush()
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,105 @@
+import argparse
+import os
+import runpy
+import sys
+
+# Heavy libraries (pandas, scipy, statsmodels, pingouin, matplotlib, seaborn)
+# are never imported here; each subcommand imports only what it runs, so the
+# counters and status checks start without them.
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def run_script(script, args=()):
+    """Run an analysis script in this process as if it was started directly."""
+    path = os.path.join(SCRIPTS_DIR, script)
+    sys.argv = [path, *args]
+    runpy.run_path(path, run_name="__main__")
+
+
+def stage_script(name):
+    from run_pipeline import STAGES
+
+    for stage in STAGES:
+        if name in (stage.name, stage.script):
+            return stage.script
+    raise SystemExit(f"Unknown stage '{name}', see '{sys.argv[0]} pipeline --list'")
+
+
+def count_sessions_command(args):
+    run_script("count_sessions.py")
+
+
+def count_interface_orders_command(args):
+    run_script("task_metrics/01_count_interface_orders.py")
+
+
+def status_command(args):
+    from run_pipeline import STAGES, is_up_to_date, load_state
+
+    state = load_state(args.workdir)
+    stale = [stage.name for stage in STAGES if not is_up_to_date(stage, args.workdir, state)]
+    for stage in STAGES:
+        print(f"{'stale' if stage.name in stale else 'ok':5}  {stage.name}")
+    if stale:
+        sys.exit(1)
+
+
+def script_command(args):
+    run_script(stage_script(args.stage), args.args)
+
+
+def diagnostics_command(args):
+    run_script("task_metrics/11_run_normality_diagnostics.py", args.args)
+
+
+def pipeline_command(args):
+    import run_pipeline
+
+    sys.argv = [run_pipeline.__file__, *args.args]
+    run_pipeline.main()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Single entry point for the multi-carousel study analytics.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparser = subparsers.add_parser("count-sessions",
+                                      help="count raw, cleaned and full-participant sessions")
+    subparser.set_defaults(func=count_sessions_command)
+
+    subparser = subparsers.add_parser("count-interface-orders",
+                                      help="count the interface orders of the sessions")
+    subparser.set_defaults(func=count_interface_orders_command)
+
+    subparser = subparsers.add_parser("status",
+                                      help="report stages whose outputs are missing or out of date (exit code 1 if any)")
+    subparser.add_argument("--workdir", default=".",
+                           help="directory holding the intermediate CSVs and outputs (default: current directory)")
+    subparser.set_defaults(func=status_command)
+
+    subparser = subparsers.add_parser("script", add_help=False,
+                                      help="run one numbered script, e.g. 'task_metrics/03' (other arguments "
+                                           "are passed to the script)")
+    subparser.add_argument("stage", help="stage name or script path relative to analytics/scripts")
+    subparser.set_defaults(func=script_command, passthrough=True)
+
+    subparser = subparsers.add_parser("diagnostics", add_help=False,
+                                      help="run the normality and sphericity checks of every metric into one table "
+                                           "(see 'diagnostics --help')")
+    subparser.set_defaults(func=diagnostics_command, passthrough=True)
+
+    subparser = subparsers.add_parser("pipeline", add_help=False,
+                                      help="run the stages that are out of date (see 'pipeline --help')")
+    subparser.set_defaults(func=pipeline_command, passthrough=True)
+
+    # Unknown arguments of 'script' and 'pipeline' are passed on unchanged
+    args, extra_args = parser.parse_known_args()
+    args.args = extra_args
+    if args.args and not getattr(args, "passthrough", False):
+        parser.error(f"unrecognized arguments: {' '.join(args.args)}")
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+import csv
+from collections import Counter
+
+from export_utils import get_steps, iter_sessions
+
+# Only the standard library and the streaming export reader are imported here,
+# so the counters start without loading pandas or the plotting stack.
+
+
+def count_sessions(file_path):
+    """Number of sessions in a Firestore export."""
+    return sum(1 for _ in iter_sessions(file_path))
+
+
+def count_distinct_sessions(csv_path):
+    """Number of distinct session ids in a cleaned task metrics CSV."""
+    with open(csv_path, newline="") as f:
+        return len({row["session_id"] for row in csv.DictReader(f)})
+
+
+def count_interface_orders(file_path):
+    """Count the interface order of every session (taken from its first step that records one)."""
+    interface_orders = Counter()
+    for _, session_content in iter_sessions(file_path):
+        for step in get_steps(session_content).values():
+            order = step.get("interfaceOrder")
+            if order:
+                interface_orders[tuple(order)] += 1
+                break  # Use only one interfaceOrder per session
+    return interface_orders
+
+
+def write_csv(path, header, rows):
+    """Write rows to a CSV file formatted like pandas' to_csv(index=False)."""
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(header)
+        writer.writerows(rows)
@@ -0,0 +1,90 @@
+import glob
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+from pool_utils import resolve_workers
+
+try:
+    import ijson
+except ImportError:  # streaming is optional, fall back to loading the whole export
+    ijson = None
+
+# Firestore collection holding one document per study session
+STUDY_COLLECTION = "multi-carousel-study"
+
+
+def iter_sessions(file_path):
+    """Yield (session_id, session_content) pairs from a Firestore export one at a time.
+
+    With ijson installed only a single session subtree is held in memory,
+    so peak memory no longer grows with the number of sessions in the export.
+    """
+    with open(file_path, "rb") as f:
+        if ijson is None:
+            study_data = json.load(f).get("__collections__", {}).get(STUDY_COLLECTION, {})
+            yield from study_data.items()
+        else:
+            yield from ijson.kvitems(f, f"__collections__.{STUDY_COLLECTION}", use_float=True)
+
+
+def get_steps(session_content):
+    """Return the steps sub-collection of a session document."""
+    return session_content.get("__collections__", {}).get("steps", {})
+
+
+def iter_steps(file_path):
+    """Yield (session_id, step_id, step_content) for every step of every session."""
+    for session_id, session_content in iter_sessions(file_path):
+        for step_id, step_content in get_steps(session_content).items():
+            yield session_id, step_id, step_content
+
+
+def iter_events(file_path):
+    """Yield (session_id, step_id, step_content, event) for every recorded event."""
+    for session_id, step_id, step_content in iter_steps(file_path):
+        for event in step_content.get("events", []):
+            yield session_id, step_id, step_content, event
+
+
+def resolve_export_paths(patterns):
+    """Expand export file paths and glob patterns into a list of unique files.
+
+    Files keep the order of `patterns` (the matches of one pattern are sorted)
+    and a file listed twice keeps its first position. This order decides
+    which export a session present in several is taken from, see latest_export_of.
+    """
+    file_paths = {}
+    for pattern in patterns:
+        matches = glob.glob(pattern)
+        if not matches:
+            raise FileNotFoundError(f"No export file matches '{pattern}'")
+        file_paths.update(dict.fromkeys(sorted(matches)))
+    return list(file_paths)
+
+
+def latest_export_of(session_ids):
+    """Map every session id to the index of the last export containing it.
+
+    `session_ids` lists the session ids of every export, in export order. A
+    session exported again is taken in full from the last export listed and
+    its records from earlier exports are dropped.
+    """
+    latest = {}
+    for index, export_session_ids in enumerate(session_ids):
+        for session_id in export_session_ids:
+            latest[session_id] = index
+    return latest
+
+
+def map_exports(func, *iterables, workers=None):
+    """Apply `func` to every export in a process pool and return the results in input order.
+
+    `func` must be a module-level function so it can be sent to the workers.
+    A single export is processed in the current process.
+    """
+    arguments = list(zip(*iterables))
+    workers = resolve_workers(workers)
+    if len(arguments) <= 1 or workers == 1:
+        return [func(*args) for args in arguments]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(func, *zip(*arguments)))
@@ -0,0 +1,411 @@
+import glob
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+import cache_utils
+import export_utils
+from cache_utils import SessionCache, content_hash, file_hash, source_hash
+from export_utils import get_steps, iter_sessions, latest_export_of, map_exports
+from table_utils import EventTableWriter, drop_event_sessions, read_table_metadata
+
+# Steps that count as study tasks
+TASK_TYPES = {"goal", "exploratory"}
+
+# Event type groups used by the per-step metrics
+INTERACTION_EVENTS = {"click", "scroll", "arrowClick", "arrowKeyDown"}
+SCROLL_EVENTS = {"scroll", "arrowClick", "arrowKeyDown"}
+FILTER_EVENTS = {"filterApply", "filterStep", "filterReset", "filterResetAll"}
+NAVIGATION_TARGETS = {"resultsPage", "detailView"}
+
+# Cached rows are only reused by the extraction code (including the export
+# traversal and the cache format) that produced them
+TASK_CACHE_NAMESPACE = f"task_metrics:{source_hash(__file__, export_utils.__file__, cache_utils.__file__)}"
+
+
+def is_task_step(step_content):
+    """A goal or exploratory task performed on one of the interfaces.
+
+    The interface option must be non-empty. This is the rule of the original
+    06_… extractor; 00_… also kept steps with an empty ("") interface option.
+    """
+    return step_content.get("taskType") in TASK_TYPES and bool(step_content.get("interfaceOption"))
+
+
+def is_final_survey_step(step_content):
+    """The final comparative survey is the only survey without an interface option."""
+    return step_content.get("taskType") == "survey" and not step_content.get("interfaceOption")
+
+
+def compute_step_metrics(session_id, step_id, step_content):
+    """Count the interactions recorded for one task step.
+
+    A filterStep counts as a reset only if its goTo is exactly True. This is
+    the rule of the original 00_… extractor; 06_… counted any truthy goTo.
+    """
+    metrics = {
+        "session_id": session_id,
+        "step_id": step_id,
+        "interface_option": step_content.get("interfaceOption"),
+        "task_type": step_content.get("taskType"),
+        "task_completion_time_sec": None,
+        "total_interactions": 0
+    }
+
+    start_time = None
+    end_time = None
+    interaction_count = 0
+    selected_accommodation = None
+    navigation_count = 0
+    filter_count = 0
+    reset_count = 0
+    hover_count = 0
+    scroll_count = 0
+
+    for event in step_content.get("events", []):
+        t = event.get("type")
+        details = event.get("details", {})
+
+        # Start / End
+        if t == "taskStart":
+            start_time = event.get("timestamp")
+        elif t == "taskEnd":
+            end_time = event.get("timestamp")
+
+        # Interactions
+        elif t in INTERACTION_EVENTS:
+            interaction_count += 1
+            if t in SCROLL_EVENTS:
+                scroll_count += 1
+            # Capture which accommodation was “booked”
+            elif details.get("targetType") == "bookNowButton":
+                selected_accommodation = details.get("accommodation")
+
+        # Navigation & Page refresh
+        elif t == "navigation":
+            dest = details.get("to")
+            if dest in NAVIGATION_TARGETS:
+                navigation_count += 1
+            elif dest == "pageRefresh":
+                reset_count += 1
+
+        # Filters
+        elif t in FILTER_EVENTS:
+            filter_count += 1
+            if t in {"filterReset", "filterResetAll"} or (t == "filterStep" and details.get("goTo") is True):
+                reset_count += 1
+
+        # Hovers
+        elif t == "hover":
+            hover_count += 1
+
+    if start_time and end_time:
+        metrics["task_completion_time_sec"] = (end_time - start_time) / 1000
+    metrics["total_interactions"] = interaction_count
+    metrics["selected_accommodation"] = selected_accommodation
+    metrics["total_navigations"] = navigation_count
+    metrics["total_filters"] = filter_count
+    metrics["total_resets"] = reset_count
+    metrics["total_hovers"] = hover_count
+    metrics["total_scrolls"] = scroll_count
+
+    return metrics
+
+
+def split_session(session_content):
+    """Return the task steps of one session and whether it reached the final survey."""
+    task_steps = []
+    completed_final_survey = False
+
+    for step_id, step_content in get_steps(session_content).items():
+        if is_task_step(step_content):
+            task_steps.append((step_id, step_content))
+        elif is_final_survey_step(step_content):
+            completed_final_survey = True
+
+    return task_steps, completed_final_survey
+
+
+class EventFrameBuilder:
+    """Collect task steps and their events into flat columns for the vectorized metrics."""
+
+    step_columns = ["session_id", "step_id", "interface_option", "task_type"]
+    category_columns = ["type", "target_type", "to"]
+
+    def __init__(self):
+        self.steps = {name: [] for name in self.step_columns}
+        self.step_index = []
+        self.timestamp = []
+        self.go_to = []
+        self.accommodation = []
+        # Categorical columns are stored as codes into a per-column category list
+        self.codes = {name: [] for name in self.category_columns}
+        self.categories = {name: {} for name in self.category_columns}
+
+    def _code(self, name, value):
+        if value is None:
+            return -1
+        return self.categories[name].setdefault(value, len(self.categories[name]))
+
+    def add_step(self, session_id, step_id, step_content):
+        step_index = len(self.steps["session_id"])
+        self.steps["session_id"].append(session_id)
+        self.steps["step_id"].append(step_id)
+        self.steps["interface_option"].append(step_content.get("interfaceOption"))
+        self.steps["task_type"].append(step_content.get("taskType"))
+
+        for event in step_content.get("events", []):
+            details = event.get("details", {})
+            go_to = details.get("goTo")
+            self.step_index.append(step_index)
+            self.timestamp.append(event.get("timestamp"))
+            self.go_to.append(go_to if isinstance(go_to, bool) else None)
+            self.accommodation.append(details.get("accommodation"))
+            self.codes["type"].append(self._code("type", event.get("type")))
+            self.codes["target_type"].append(self._code("target_type", details.get("targetType")))
+            self.codes["to"].append(self._code("to", details.get("to")))
+
+    def to_frames(self):
+        """Return (steps, events); events are ordered by step and then by recording order."""
+        steps = pd.DataFrame(self.steps)
+        events = pd.DataFrame({
+            "step_index": np.array(self.step_index, dtype=np.int64),
+            "timestamp": np.array(self.timestamp, dtype=np.float64),
+            "go_to": pd.array(self.go_to, dtype="boolean"),
+            "accommodation": pd.Series(self.accommodation, dtype=object),
+        })
+        for name in self.category_columns:
+            events[name] = pd.Categorical.from_codes(
+                np.array(self.codes[name], dtype=np.int32), categories=list(self.categories[name])
+            )
+        return steps, events
+
+
+def compute_task_metrics_vectorized(steps, events):
+    """Grouped equivalent of compute_step_metrics over all steps at once."""
+    n_steps = len(steps)
+    step_index = events["step_index"].to_numpy()
+    event_type = events["type"]
+
+    def count(mask):
+        return np.bincount(step_index[mask.to_numpy(dtype=bool)], minlength=n_steps)
+
+    def last(mask, column, fill):
+        # Events are sorted by step, so the last masked event of a step is followed by another step
+        positions = np.flatnonzero(mask.to_numpy(dtype=bool))
+        masked_steps = step_index[positions]
+        is_last = np.ones(len(positions), dtype=bool)
+        is_last[:-1] = masked_steps[1:] != masked_steps[:-1]
+        values = np.full(n_steps, fill, dtype=object if fill is None else np.float64)
+        values[masked_steps[is_last]] = events[column].to_numpy()[positions[is_last]]
+        return values
+
+    start_time = last(event_type == "taskStart", "timestamp", np.nan)
+    end_time = last(event_type == "taskEnd", "timestamp", np.nan)
+    # Same truthiness test as the loop: both timestamps present and non-zero
+    completed = ~np.isnan(start_time) & ~np.isnan(end_time) & (start_time != 0) & (end_time != 0)
+
+    is_navigation = event_type == "navigation"
+    is_filter = event_type.isin(FILTER_EVENTS)
+    is_reset = (
+        (is_navigation & (events["to"] == "pageRefresh"))
+        | event_type.isin({"filterReset", "filterResetAll"})
+        | ((event_type == "filterStep") & events["go_to"].eq(True).fillna(False))
+    )
+    is_booking = (event_type == "click") & (events["target_type"] == "bookNowButton")
+
+    task_metrics = steps.copy()
+    task_metrics["task_completion_time_sec"] = np.where(completed, (end_time - start_time) / 1000, np.nan)
+    task_metrics["total_interactions"] = count(event_type.isin(INTERACTION_EVENTS))
+    task_metrics["selected_accommodation"] = last(is_booking, "accommodation", None)
+    task_metrics["total_navigations"] = count(is_navigation & events["to"].isin(NAVIGATION_TARGETS))
+    task_metrics["total_filters"] = count(is_filter)
+    task_metrics["total_resets"] = count(is_reset)
+    task_metrics["total_hovers"] = count(event_type == "hover")
+    task_metrics["total_scrolls"] = count(event_type.isin(SCROLL_EVENTS))
+
+    return task_metrics
+
+
+def extract_task_metrics(file_path, event_writer=None, vectorized=False, cache=None):
+    """Read the export once and return (task_metrics, final_survey_session_ids, session_ids).
+
+    Every goal/exploratory step becomes one metric row; the session ids of
+    participants who submitted the final survey and of every session in the
+    export are collected in the same pass.
+    If an EventTableWriter is given, the raw task events are written to it as well.
+    With `vectorized=True` the events are flattened into one frame and the
+    metrics are computed with grouped aggregations instead of the per-event loop.
+    With a SessionCache, unchanged sessions reuse their cached rows.
+    """
+    all_metrics = []
+    final_survey_session_ids = set()
+    builder = EventFrameBuilder() if vectorized else None
+    session_order = {}
+    new_sessions = []
+
+    for position, (session_id, session_content) in enumerate(iter_sessions(file_path)):
+        session_order[session_id] = position
+        task_steps, completed_final_survey = split_session(session_content)
+        if completed_final_survey:
+            final_survey_session_ids.add(session_id)
+        if event_writer is not None:
+            for step_id, step_content in task_steps:
+                event_writer.write_step(session_id, step_id, step_content)
+
+        session_hash = None
+        if cache is not None:
+            session_hash = content_hash(session_content)
+            cached = cache.get(session_id, session_hash)
+            if cached is not None:
+                all_metrics.extend(cached["rows"])
+                continue
+
+        if builder is not None:
+            for step_id, step_content in task_steps:
+                builder.add_step(session_id, step_id, step_content)
+            new_sessions.append((session_id, session_hash, completed_final_survey))
+        else:
+            rows = [compute_step_metrics(session_id, step_id, step_content) for step_id, step_content in task_steps]
+            all_metrics.extend(rows)
+            if cache is not None:
+                cache.put(session_id, session_hash, {"rows": rows, "completed_final_survey": completed_final_survey})
+
+    if builder is None or not new_sessions:
+        return pd.DataFrame(all_metrics), final_survey_session_ids, list(session_order)
+
+    task_metrics = compute_task_metrics_vectorized(*builder.to_frames())
+    if cache is not None:
+        rows_by_session = {
+            session_id: group.to_dict("records") for session_id, group in task_metrics.groupby("session_id", sort=False)
+        }
+        for session_id, session_hash, completed_final_survey in new_sessions:
+            cache.put(session_id, session_hash,
+                      {"rows": rows_by_session.get(session_id, []), "completed_final_survey": completed_final_survey})
+    if all_metrics:
+        # Put the cached rows back in export order
+        task_metrics = pd.concat([pd.DataFrame(all_metrics), task_metrics], ignore_index=True)
+        order = np.argsort(task_metrics["session_id"].map(session_order).to_numpy(), kind="stable")
+        task_metrics = task_metrics.iloc[order].reset_index(drop=True)
+
+    return task_metrics, final_survey_session_ids, list(session_order)
+
+
+def _event_table_path(event_table_dir, file_path):
+    # Part files are named after the export, so they stay valid when other exports are added
+    export_key = hashlib.sha1(os.path.abspath(file_path).encode()).hexdigest()[:12]
+    return os.path.join(event_table_dir, f"part-{export_key}.parquet")
+
+
+def _extract_export(file_path, vectorized, event_table_path, cache_path):
+    if cache_path is None:
+        if event_table_path is None:
+            return extract_task_metrics(file_path, vectorized=vectorized)
+        with EventTableWriter(event_table_path) as event_writer:
+            return extract_task_metrics(file_path, event_writer, vectorized=vectorized)
+
+    with SessionCache(cache_path, TASK_CACHE_NAMESPACE) as cache:
+        export_hash = file_hash(file_path)
+
+        # An unchanged export (with its event part in place) is served without parsing it
+        event_table_current = (
+            event_table_path is None
+            or (os.path.exists(event_table_path)
+                and read_table_metadata(event_table_path).get("export_hash") == export_hash)
+        )
+        cached_export = cache.get_export(export_hash) if event_table_current else None
+        if cached_export is not None:
+            rows = [row for _, payload in cached_export for row in payload["rows"]]
+            final_survey_session_ids = {
+                session_id for session_id, payload in cached_export if payload["completed_final_survey"]
+            }
+            return pd.DataFrame(rows), final_survey_session_ids, [session_id for session_id, _ in cached_export]
+
+        if event_table_path is None:
+            result = extract_task_metrics(file_path, vectorized=vectorized, cache=cache)
+        else:
+            with EventTableWriter(event_table_path, metadata={"export_hash": export_hash}) as event_writer:
+                result = extract_task_metrics(file_path, event_writer, vectorized=vectorized, cache=cache)
+        cache.put_export(export_hash)
+        return result
+
+
+def extract_task_metrics_from_exports(file_paths, workers=None, vectorized=False, event_table_dir=None,
+                                      cache_path=None):
+    """Extract several exports in a process pool and merge them like a single export.
+
+    Rows are concatenated in file order; a session present in several
+    exports keeps the rows, final survey status and events of the last one
+    (see latest_export_of). With `event_table_dir`, each export writes its
+    events to its own part file, so the directory reads back as one table;
+    parts are rewritten without the sessions a later export supersedes.
+    With `cache_path`, only new or changed sessions are re-extracted.
+    """
+    event_table_paths = [None] * len(file_paths)
+    if event_table_dir is not None:
+        os.makedirs(event_table_dir, exist_ok=True)
+        event_table_paths = [_event_table_path(event_table_dir, file_path) for file_path in file_paths]
+        for part in glob.glob(os.path.join(event_table_dir, "part-*.parquet")):
+            if part not in event_table_paths:
+                os.remove(part)
+
+    results = map_exports(_extract_export, file_paths, [vectorized] * len(file_paths), event_table_paths,
+                          [cache_path] * len(file_paths), workers=workers)
+
+    latest = latest_export_of(session_ids for _, _, session_ids in results)
+
+    task_metrics = pd.concat(
+        [metrics[metrics["session_id"].map(latest) == index] if "session_id" in metrics else metrics
+         for index, (metrics, _, _) in enumerate(results)],
+        ignore_index=True,
+    )
+    final_survey_session_ids = {
+        session_id for index, (_, session_ids, _) in enumerate(results) for session_id in session_ids
+        if latest[session_id] == index
+    }
+
+    if event_table_dir is not None:
+        for index, (event_table_path, (_, _, session_ids)) in enumerate(zip(event_table_paths, results)):
+            superseded = {session_id for session_id in session_ids if latest[session_id] != index}
+            if superseded:
+                drop_event_sessions(event_table_path, superseded)
+
+    return task_metrics, final_survey_session_ids
+
+
+def clean_task_metrics(task_metrics):
+    """Apply the data-cleaning rules shared by every task-level analysis."""
+    task_metrics_clean = task_metrics.copy()
+
+    # 1. Drop incomplete tasks
+    task_metrics_clean = task_metrics_clean[task_metrics_clean["task_completion_time_sec"].notnull()]
+
+    # 2. Filter on realistic durations
+    task_metrics_clean = task_metrics_clean[task_metrics_clean["task_completion_time_sec"].between(5, 1000)]
+
+    # 3. Require a Book click
+    task_metrics_clean = task_metrics_clean[task_metrics_clean["selected_accommodation"].notnull()]
+
+    # 4. Drop zero‐interaction goals
+    task_metrics_clean = task_metrics_clean[task_metrics_clean["total_interactions"] > 0]
+
+    return task_metrics_clean
+
+
+def select_full_participants(task_metrics_clean, final_survey_session_ids):
+    """Keep sessions that finished the study with exactly 2 clean tasks on each of the 3 interfaces."""
+    task_metrics_clean = task_metrics_clean[task_metrics_clean["session_id"].isin(final_survey_session_ids)]
+
+    valid_sessions = (
+        task_metrics_clean
+        .groupby(["session_id", "interface_option"])
+        .size()
+        .unstack(fill_value=0)
+    )
+    complete_sessions = valid_sessions[
+        (valid_sessions == 2).all(axis=1)
+    ].index
+
+    return task_metrics_clean[task_metrics_clean["session_id"].isin(complete_sessions)]
@@ -0,0 +1,185 @@
+import inspect
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+
+# Figures are only ever written to files, also from worker processes
+matplotlib.use("Agg")
+
+import matplotlib.pyplot as plt
+import numpy as np
+import scipy.stats as st
+
+from cache_utils import content_hash, source_hash
+from pool_utils import resolve_workers
+
+# A figure file: `draw(data, **params)` returns the matplotlib figure saved to
+# `path` with `savefig(**save)`. `draw` must be a module-level function so the
+# figure can be rendered in a worker process.
+Figure = namedtuple("Figure", ["path", "draw", "data", "params", "save"], defaults=[None, None])
+
+# PNG text chunk holding the hash of the inputs a figure file was rendered from
+FIGURE_HASH_KEY = "FigureHash"
+
+
+def figure_hash(figure):
+    """Hash of everything a figure depends on: its data, parameters, savefig options,
+    the source of the module drawing it and the matplotlib version."""
+    draw_source = source_hash(inspect.getsourcefile(figure.draw))
+    return content_hash((figure.draw.__module__, figure.draw.__qualname__, draw_source, matplotlib.__version__,
+                         figure.data, figure.params, figure.save))
+
+
+def stored_hash(path):
+    """The hash a PNG figure file was rendered from, or None for a missing or foreign file."""
+    from PIL import Image
+
+    try:
+        with Image.open(path) as image:
+            return image.text.get(FIGURE_HASH_KEY)
+    except (OSError, AttributeError):
+        return None
+
+
+def _render(task):
+    """Draw and save one figure; a module-level function so it can run in a worker process."""
+    figure, digest = task
+    fig = figure.draw(figure.data, **(figure.params or {}))
+    directory = os.path.dirname(figure.path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    fig.savefig(figure.path, metadata={FIGURE_HASH_KEY: digest}, **(figure.save or {}))
+    plt.close(fig)
+    return figure.path
+
+
+def render_figures(figures, workers=None, force=False):
+    """Render the figures whose file is missing or was rendered from other inputs.
+
+    Figures are drawn in a pool of `workers` processes (default: resolve_workers)
+    and their input hash is stored in the PNG, so unchanged figures are skipped
+    on the next run. Returns the paths of the figures rendered and skipped.
+    """
+    tasks, skipped = [], []
+    for figure in figures:
+        digest = figure_hash(figure)
+        if not force and stored_hash(figure.path) == digest:
+            skipped.append(figure.path)
+        else:
+            tasks.append((figure, digest))
+
+    workers = resolve_workers(workers)
+    if workers == 1 or len(tasks) <= 1:
+        return [_render(task) for task in tasks], skipped
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+        return list(pool.map(_render, tasks)), skipped
+
+
+def add_figure_arguments(parser):
+    """Add the --workers and --force options of render_figures to a script's parser."""
+    parser.add_argument("--workers", type=int, default=None,
+                        help="number of processes rendering the figures (default: one per CPU)")
+    parser.add_argument("--force", action="store_true",
+                        help="render every figure, also those whose inputs are unchanged")
+
+
+# Helper to format a proportion axis as percentages
+def _percent_axis(ax):
+    ax.set_ylim(0, 1)
+    ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda y, _: f"{y:.0%}"))
+
+
+def qq_plot(data, title):
+    """Normal Q-Q plot of a sample."""
+    fig = plt.figure()
+    st.probplot(data, dist="norm", plot=plt)
+    plt.title(title)
+    return fig
+
+
+def radar_chart(stats, title):
+    """Radar chart of a Series of mean ratings (1-7) indexed by item label."""
+    labels = stats.index.values
+    values = np.concatenate((stats.values, [stats.values[0]]))  # close the circle
+    angles = np.linspace(0, 2 * np.pi, len(labels), endpoint=False).tolist()
+    angles += angles[:1]
+
+    fig, ax = plt.subplots(figsize=(6, 6), subplot_kw=dict(polar=True))
+    ax.plot(angles, values, color="#006D77", linewidth=2)
+    ax.fill(angles, values, color="#BCDEDC", alpha=0.25)
+    ax.set_yticks([1, 3, 5, 7])
+    ax.set_ylim(1, 7)
+    ax.set_title(title, size=14, pad=20)
+    ax.set_xticks(angles[:-1])
+    ax.set_xticklabels(labels, fontsize=9)
+    fig.tight_layout()
+    return fig
+
+
+def rating_heatmap(stats, title, columns):
+    """Annotated heatmap of mean ratings (1-7) of a long table (item_label,
+    interface_label, mean), with items as rows and `columns` as interfaces."""
+    import seaborn as sns
+
+    table = stats.pivot(index="item_label", columns="interface_label", values="mean")[columns]
+    fig = plt.figure(figsize=(10, 10))
+    sns.heatmap(
+        table,
+        annot=True,
+        fmt=".2f",
+        cmap="YlGnBu",
+        vmin=1, vmax=7,
+        linewidths=0.5, linecolor='white',
+        cbar_kws={"label": "Mean Rating (1-7)"}
+    )
+    plt.title(title, fontsize=14, pad=12)
+    plt.xlabel('')
+    plt.ylabel('')
+    fig.tight_layout()
+    return fig
+
+
+def proportion_bar(proportions, title, colors):
+    """Bar chart of a Series of proportions."""
+    fig = plt.figure(figsize=(4, 3))
+    proportions.plot.bar(color=colors)
+    plt.title(title)
+    plt.xlabel("")
+    plt.ylabel("Proportion of participants")
+    plt.xticks(rotation=0)
+    _percent_axis(plt.gca())
+    fig.tight_layout()
+    return fig
+
+
+def stacked_proportion_bar(proportions, title, colors, legend_title):
+    """Stacked bar chart of a DataFrame of proportions, one bar per row and one segment per column."""
+    fig = plt.figure(figsize=(5, 3))
+    bottom = np.zeros(len(proportions))
+    for column, color in zip(proportions.columns, colors):
+        plt.bar(proportions.index, proportions[column], bottom=bottom, label=column, color=color)
+        bottom += proportions[column].values
+
+    plt.title(title)
+    plt.ylabel("Proportion of participants")
+    plt.xticks(rotation=0)
+    plt.legend(title=legend_title, bbox_to_anchor=(1.05, 1), loc='upper left')
+    _percent_axis(plt.gca())
+    fig.tight_layout()
+    return fig
+
+
+def boxplot_grid(df, metrics, by, title, figsize=(10, 8)):
+    """Side-by-side boxplots of `metrics` grouped by the `by` column."""
+    fig, axes = plt.subplots(1, len(metrics), figsize=figsize)
+    for ax, metric in zip(np.atleast_1d(axes), metrics):
+        df.boxplot(column=metric, by=by, ax=ax)
+        ax.set_title(metric.replace('_', ' ').title())
+        ax.set_xlabel('')
+        ax.set_ylabel(metric.replace('_', ' ').title())
+
+    fig.suptitle(title)
+    fig.tight_layout(rect=[0, 0.03, 1, 0.95])
+    return fig
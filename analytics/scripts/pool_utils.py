@@ -0,0 +1,12 @@
+import os
+
+# Environment variable capping the processes of every pool started by a
+# script; run_pipeline.py sets it when it runs several stages at once
+WORKERS_ENV = "ANALYTICS_WORKERS"
+
+
+def resolve_workers(workers=None):
+    """Number of worker processes: `workers` if given, else $ANALYTICS_WORKERS, else one per CPU."""
+    if workers:
+        return workers
+    return int(os.environ.get(WORKERS_ENV) or 0) or os.cpu_count() or 1
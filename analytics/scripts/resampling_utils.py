@@ -0,0 +1,179 @@
+import itertools
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.stats import rankdata
+
+from pool_utils import resolve_workers
+from stats_utils import condition_cube
+
+# Columns of the tidy table returned by paired_effect_sizes
+EFFECT_SIZE_COLUMNS = [
+    "subset", "metric", "comparison", "n",
+    "mean_diff", "mean_diff_ci_low", "mean_diff_ci_high",
+    "rank_biserial", "rank_biserial_ci_low", "rank_biserial_ci_high",
+    "p_permutation", "permutation", "n_resamples",
+]
+
+# Up to this many subjects the sign-flip distribution is enumerated exactly
+# (two halves of at most 2**20 partial sums each)
+MAX_EXACT_SUBJECTS = 40
+
+# Resampled values held in memory per chunk (float64: 32 MB)
+CHUNK_SIZE = 1 << 22
+
+
+def rank_biserial(differences):
+    """Matched-pairs rank-biserial correlation of every row of paired differences.
+
+    Zero differences are dropped, as in scipy's default Wilcoxon test.
+    """
+    differences = np.atleast_2d(differences)
+    magnitudes = np.abs(differences)
+    magnitudes[magnitudes == 0] = np.nan
+    ranks = np.nan_to_num(rankdata(magnitudes, axis=-1, nan_policy="omit"))
+    total = ranks.sum(axis=-1)
+    r_plus = np.where(differences > 0, ranks, 0).sum(axis=-1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (2 * r_plus - total) / total
+
+
+def _statistics(samples):
+    """(mean difference, rank-biserial) of every row of resampled differences."""
+    return np.column_stack([samples.mean(axis=-1), rank_biserial(samples)])
+
+
+def _resample_chunk(task):
+    """Run one chunk of resamples; a module-level function so it can run in a worker process."""
+    kind, differences, rows, entropy = task
+    rng = np.random.default_rng(np.random.SeedSequence(entropy))
+    n = len(differences)
+    if kind == "bootstrap":
+        # One row of subject indices per resample
+        return _statistics(differences[rng.integers(0, n, size=(rows, n))])
+    # One row of random signs per sign-flip permutation
+    signs = 1 - 2 * rng.integers(0, 2, size=(rows, n), dtype=np.int8)
+    return signs @ differences
+
+
+def _sign_flip_sums(differences):
+    """Sums of `differences` under all 2**n sign assignments."""
+    sums = np.zeros(1)
+    for difference in differences:
+        sums = np.concatenate([sums + difference, sums - difference])
+    return sums
+
+
+def exact_permutation_p(differences):
+    """Exact two-sided sign-flip permutation p-value of the sum of paired differences.
+
+    The 2**n sign-flip sums are never materialized: the sums of both halves
+    are enumerated, and for every sum of the second half the sums of the
+    first half that reach the observed magnitude are counted by binary search.
+    """
+    differences = np.asarray(differences, dtype=float)
+    # Tolerance for the rounding of sums that equal the observed one
+    threshold = abs(differences.sum()) - 1e-10 * np.abs(differences).sum()
+    if threshold <= 0:
+        return 1.0
+
+    half = len(differences) // 2
+    low = np.sort(_sign_flip_sums(differences[:half]))
+    high = _sign_flip_sums(differences[half:])
+    at_least = len(low) - np.searchsorted(low, threshold - high, side="left")
+    at_most = np.searchsorted(low, -threshold - high, side="right")
+    return (at_least.sum() + at_most.sum()) / 2 ** len(differences)
+
+
+def _chunk_rows(n_resamples, n):
+    """Split `n_resamples` resamples of `n` values into chunks of at most CHUNK_SIZE values."""
+    rows = max(1, CHUNK_SIZE // n)
+    return [min(rows, n_resamples - start) for start in range(0, n_resamples, rows)]
+
+
+def paired_effect_sizes(df, metrics, conditions, subsets=None, subject="session_id",
+                        condition="interface_option", n_resamples=10_000, confidence=0.95,
+                        seed=0, workers=1, cube=None):
+    """Effect sizes with bootstrap CIs and permutation p-values for every condition pair.
+
+    Rows are averaged per subject and condition and each metric keeps the
+    subjects with values for all conditions, like stats_utils.friedman_wilcoxon.
+    For each pair the paired differences (first minus second condition) give
+    the mean difference and the matched-pairs rank-biserial correlation, with
+    percentile CIs from `n_resamples` bootstrap resamples, and a two-sided
+    sign-flip permutation p-value of the mean difference that is exact for up
+    to MAX_EXACT_SUBJECTS subjects and estimated from `n_resamples` random
+    sign flips above that.
+
+    Resamples are drawn as index (or sign) matrices in chunks of CHUNK_SIZE
+    values, which can be spread over `workers` processes. Every chunk has its
+    own seed derived from `seed`, so results do not depend on `workers`.
+
+    With a MetricCube of `df`, its per-subject averages are reused as in
+    friedman_wilcoxon.
+    """
+    if subsets is None:
+        subsets = cube.slices if cube is not None else {"all": np.ones(len(df), dtype=bool)}
+    pairs = list(itertools.combinations(range(len(conditions)), 2))
+
+    families = []
+    for label, mask in subsets.items():
+        if cube is not None:
+            averages = cube.cube(label)
+        else:
+            averages = condition_cube(df[mask], metrics, conditions, subject, condition)
+        for m, metric in enumerate(metrics):
+            values = averages[:, m, :]
+            values = values[~np.isnan(values).any(axis=1)]
+            if len(values) == 0:
+                continue
+            for a, b in pairs:
+                families.append((label, metric, f"{conditions[a]} vs {conditions[b]}", values[:, a] - values[:, b]))
+
+    # Every chunk of resamples of every family is an independent task
+    tasks, owners = [], []
+    for f, (_, _, _, differences) in enumerate(families):
+        for kind in ("bootstrap", "permutation"):
+            if kind == "permutation" and len(differences) <= MAX_EXACT_SUBJECTS:
+                continue
+            for c, rows in enumerate(_chunk_rows(n_resamples, len(differences))):
+                tasks.append((kind, differences, rows, [seed, f, kind == "permutation", c]))
+                owners.append((f, kind))
+
+    workers = resolve_workers(workers)
+    if workers == 1 or len(tasks) <= 1:
+        chunk_results = [_resample_chunk(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunk_results = list(pool.map(_resample_chunk, tasks, chunksize=max(1, len(tasks) // 64)))
+
+    resamples = {}
+    for owner, chunk_result in zip(owners, chunk_results):
+        resamples.setdefault(owner, []).append(chunk_result)
+
+    tail = (1 - confidence) / 2
+    results = []
+    for f, (label, metric, comparison, differences) in enumerate(families):
+        n = len(differences)
+        observed = _statistics(differences[None, :])[0]
+        bootstrap = np.concatenate(resamples[(f, "bootstrap")])
+        with warnings.catch_warnings():
+            # The rank-biserial is undefined when every difference is zero
+            warnings.simplefilter("ignore", RuntimeWarning)
+            ci_low, ci_high = np.nanquantile(bootstrap, [tail, 1 - tail], axis=0)
+
+        if n <= MAX_EXACT_SUBJECTS:
+            p_permutation, permutation = exact_permutation_p(differences), "exact"
+        else:
+            sums = np.concatenate(resamples[(f, "permutation")])
+            threshold = abs(differences.sum()) - 1e-10 * np.abs(differences).sum()
+            p_permutation = ((np.abs(sums) >= threshold).sum() + 1) / (len(sums) + 1)
+            permutation = "monte carlo"
+
+        results.append((label, metric, comparison, n,
+                        observed[0], ci_low[0], ci_high[0],
+                        observed[1], ci_low[1], ci_high[1],
+                        p_permutation, permutation, n_resamples))
+    return pd.DataFrame(results, columns=EFFECT_SIZE_COLUMNS)
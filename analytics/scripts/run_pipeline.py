@@ -0,0 +1,290 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from cache_utils import file_hash
+from pool_utils import WORKERS_ENV
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+STATE_FILE = ".pipeline_state.json"
+
+TASK_EXPORT = '/data/finalDataN68.json'
+SURVEY_EXPORT = '/data/finalData.json'
+
+# A numbered analysis script with the CWD-relative files it reads and writes
+Stage = namedtuple("Stage", ["name", "script", "inputs", "outputs"])
+
+STAGES = [
+    # ---> Task metrics
+    Stage("task_metrics/00", "task_metrics/00_extract_clean_task_metrics.py",
+          [TASK_EXPORT],
+          ["task_metrics_clean.csv", "task_metrics_clean.parquet", "task_events",
+           "task_counts_before_cleaning.csv", "task_counts_after_cleaning.csv"]),
+    Stage("task_metrics/01", "task_metrics/01_count_interface_orders.py",
+          [TASK_EXPORT],
+          ["interface_order_count.csv"]),
+    Stage("task_metrics/02", "task_metrics/02_generate_interface_descriptive_stats.py",
+          ["task_metrics_clean.csv"],
+          ["interface_descriptive_stats.csv", "interface_task_descriptive_stats.csv"]),
+    Stage("task_metrics/03", "task_metrics/03_run_shapiro_wilk_test.py",
+          ["task_metrics_clean.csv"],
+          ["shapiro_all_tasks.csv", "shapiro_exploratory_tasks.csv", "shapiro_goal_tasks.csv"]),
+    Stage("task_metrics/04", "task_metrics/04_generate_qq_plots.py",
+          ["task_metrics_clean.csv"],
+          ["qq_plots"]),
+    Stage("task_metrics/05", "task_metrics/05_run_mauchly_test.py",
+          ["task_metrics_clean_full_participants.csv"],
+          ["mauchly"]),
+    Stage("task_metrics/06", "task_metrics/06_extract_clean_task_metrics_full_participants.py",
+          [TASK_EXPORT],
+          ["task_metrics_clean_full_participants.csv", "task_metrics_clean_full_participants.parquet",
+           "task_counts_before_cleaning_full_participants.csv", "task_counts_after_cleaning_full_participants.csv"]),
+    Stage("task_metrics/07", "task_metrics/07_run_friedman_wilcoxon_test.py",
+          ["task_metrics_clean_full_participants.csv"],
+          ["friedman_wilcoxon"]),
+    Stage("task_metrics/08", "task_metrics/08_analyze_goal_task_success_rates.py",
+          ["task_metrics_clean.parquet"],
+          ["goal_task_success_rates.png"]),
+    Stage("task_metrics/09", "task_metrics/09_run_shapiro_wilk_test_goal_outcome.py",
+          ["task_metrics_clean.parquet"],
+          ["shapiro_goal_outcome_metrics.csv"]),
+    Stage("task_metrics/10", "task_metrics/10_analyze_goal_outcome_quality.py",
+          ["task_metrics_clean_full_participants.parquet"],
+          ["goal_outcome_descriptive_stats.csv", "friedman_wilcoxon_goal_outcome.csv", "goal_outcome_effect_sizes.csv",
+           "goal_outcome_boxplots.png"]),
+    Stage("task_metrics/11", "task_metrics/11_run_normality_diagnostics.py",
+          ["task_metrics_clean.parquet", "task_metrics_clean_full_participants.parquet"],
+          ["normality_diagnostics.csv"]),
+
+    # ---> Surveys
+    Stage("surveys/00", "surveys/00_extract_clean_survey_data.py",
+          [SURVEY_EXPORT],
+          ["survey_post_interface_clean.csv", "survey_final_clean.csv", "survey_metrics_clean.csv",
+           "survey_answers.parquet"]),
+    Stage("surveys/01", "surveys/01_generate_post_interface_common_questions_descriptive_stats.py",
+          ["survey_answers.parquet"],
+          ["post_interface_survey_common_questions_descriptive_stats.csv", "post_interface_boxplots.png"]),
+    Stage("surveys/02", "surveys/02_run_friedman_wilcoxon_test_on_post_interface_common_questions.py",
+          ["survey_answers.parquet"],
+          ["friedman_test_results.csv", "wilcoxon_posthoc_results.csv"]),
+    Stage("surveys/03", "surveys/03_analyze_interface_specific_questions.py",
+          ["survey_answers.parquet"],
+          ["interface_specific_survey_question_stats.csv"]),
+    Stage("surveys/04", "surveys/04_generate_radar_charts_and_heatmaps_for_interface_specific_items.py",
+          ["interface_specific_survey_question_stats.csv"],
+          ["radar_benchmark.png", "radar_single.png", "radar_multi.png", "interface_specific_items_heatmap.png"]),
+    Stage("surveys/05", "surveys/05_extract_interface_qualitative_feedback.py",
+          ["survey_answers.parquet"],
+          ["qualitative_feedback_by_interface"]),
+    Stage("surveys/06", "surveys/06_generate_plots_final_survey.py",
+          ["survey_answers.parquet"],
+          ["final_survey_plots"]),
+    Stage("surveys/07", "surveys/07_extract_final_survey_open_feedback_responses.py",
+          ["survey_answers.parquet"],
+          ["final_survey_open_feedback.csv"]),
+    Stage("surveys/08", "surveys/08_analyze_demographic_data.py",
+          ["survey_answers.parquet"],
+          ["demographic_data_summary.csv", "demographics_plots"]),
+]
+
+
+def stage_dependencies(stages):
+    """Map every stage name to the names of the stages producing its inputs."""
+    producers = {output: stage.name for stage in stages for output in stage.outputs}
+    return {
+        stage.name: {producers[path] for path in stage.inputs if path in producers}
+        for stage in stages
+    }
+
+
+def select_stages(stages, targets):
+    """Return the target stages together with everything upstream of them, in declaration order."""
+    if not targets:
+        return list(stages)
+
+    names = {stage.name for stage in stages}
+    unknown = [target for target in targets if target not in names]
+    if unknown:
+        raise ValueError(f"Unknown stage(s): {', '.join(unknown)}")
+
+    dependencies = stage_dependencies(stages)
+    selected = set()
+    pending = list(targets)
+    while pending:
+        name = pending.pop()
+        if name not in selected:
+            selected.add(name)
+            pending.extend(dependencies[name])
+    return [stage for stage in stages if stage.name in selected]
+
+
+def local_modules(script_path):
+    """The script and the helper modules of this directory it imports, transitively."""
+    modules = []
+    pending = [script_path]
+    while pending:
+        path = pending.pop()
+        if path in modules:
+            continue
+        modules.append(path)
+        with open(path) as f:
+            source = f.read()
+        for name in re.findall(r"^\s*(?:from|import)\s+(\w+)", source, flags=re.MULTILINE):
+            module_path = os.path.join(SCRIPTS_DIR, f"{name}.py")
+            if os.path.exists(module_path):
+                pending.append(module_path)
+    return sorted(modules)
+
+
+def stage_fingerprint(stage, workdir):
+    """Hash of the stage's code and of the current contents of its inputs."""
+    sha = hashlib.sha256()
+    for module_path in local_modules(os.path.join(SCRIPTS_DIR, stage.script)):
+        sha.update(os.path.relpath(module_path, SCRIPTS_DIR).encode())
+        sha.update(file_hash(module_path).encode())
+    for path in stage.inputs:
+        sha.update(path.encode())
+        sha.update(file_hash(os.path.join(workdir, path)).encode())
+    return sha.hexdigest()
+
+
+def is_up_to_date(stage, workdir, state):
+    paths = [os.path.join(workdir, path) for path in stage.inputs + stage.outputs]
+    if not all(os.path.exists(path) for path in paths):
+        return False
+    return state.get(stage.name) == stage_fingerprint(stage, workdir)
+
+
+def run_stage(stage, workdir, workers=None):
+    """Run a stage's script in `workdir` and return (returncode, output, seconds).
+
+    `workers` caps the process pools the script starts (see pool_utils), unless
+    $ANALYTICS_WORKERS is already set.
+    """
+    env = dict(os.environ)
+    env.setdefault("MPLBACKEND", "Agg")  # stages run unattended, never open plot windows
+    if workers:
+        env.setdefault(WORKERS_ENV, str(workers))
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, os.path.join(SCRIPTS_DIR, stage.script)],
+        cwd=workdir, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+    )
+    return completed.returncode, completed.stdout, time.perf_counter() - start
+
+
+def load_state(workdir):
+    state_path = os.path.join(workdir, STATE_FILE)
+    if not os.path.exists(state_path):
+        return {}
+    with open(state_path) as f:
+        return json.load(f)
+
+
+def save_state(workdir, state):
+    with open(os.path.join(workdir, STATE_FILE), "w") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+
+
+def run_pipeline(stages, workdir=".", jobs=None, force=False, dry_run=False):
+    """Run the stages in dependency order, independent stages concurrently.
+
+    A stage is skipped when its outputs exist and neither its code nor the
+    contents of its inputs changed since its last successful run. Because
+    inputs are compared by content, a re-run stage that reproduces the same
+    outputs does not invalidate the stages downstream of it. The CPUs are
+    shared between the `jobs` concurrent stages: each stage's own process
+    pools get CPUs // jobs workers.
+    Returns the names of the failed stages.
+    """
+    dependencies = stage_dependencies(stages)
+    names = {stage.name for stage in stages}
+    # Dependencies outside the selection are treated as already satisfied
+    waiting = {stage.name: dependencies[stage.name] & names for stage in stages}
+    by_name = {stage.name: stage for stage in stages}
+    state = load_state(workdir)
+    done, failed = set(), []
+    would_run = set()  # only used for dry runs, where upstream outputs are not refreshed
+    cpus = os.cpu_count() or 1
+    jobs = jobs or cpus
+    workers = max(1, cpus // jobs)
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        running = {}
+        while waiting or running:
+            for name in [name for name, deps in waiting.items() if deps <= done]:
+                del waiting[name]
+                stage = by_name[name]
+                stale_upstream = bool(dependencies[name] & would_run)
+                if not force and not stale_upstream and is_up_to_date(stage, workdir, state):
+                    print(f"[skip] {name}")
+                    done.add(name)
+                elif dry_run:
+                    print(f"[run]  {name}")
+                    would_run.add(name)
+                    done.add(name)
+                else:
+                    running[pool.submit(run_stage, stage, workdir, workers)] = stage
+
+            if not running:
+                if waiting and not any(deps <= done for deps in waiting.values()):
+                    # Everything left depends on a failed stage
+                    for name in waiting:
+                        print(f"[blocked] {name}")
+                    break
+                continue
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                stage = running.pop(future)
+                returncode, output, seconds = future.result()
+                print(f"[{'done' if returncode == 0 else 'FAIL'}] {stage.name} ({seconds:.1f}s)")
+                if output.strip():
+                    print(output.rstrip())
+                if returncode == 0:
+                    state[stage.name] = stage_fingerprint(stage, workdir)
+                    save_state(workdir, state)
+                    done.add(stage.name)
+                else:
+                    failed.append(stage.name)
+
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the numbered analytics scripts, skipping up-to-date stages.")
+    parser.add_argument("stages", nargs="*",
+                        help="stages to bring up to date together with their dependencies, e.g. 'task_metrics/07' "
+                             "(default: all)")
+    parser.add_argument("--workdir", default=".",
+                        help="directory holding the intermediate CSVs and outputs (default: current directory)")
+    parser.add_argument("--jobs", type=int, default=None,
+                        help="number of stages run at the same time (default: one per CPU)")
+    parser.add_argument("--force", action="store_true",
+                        help="run the selected stages even if they are up to date")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="only print which stages would run")
+    parser.add_argument("--list", action="store_true",
+                        help="list the stages with their dependencies and exit")
+    args = parser.parse_args()
+
+    if args.list:
+        for name, deps in stage_dependencies(STAGES).items():
+            print(f"{name}: {', '.join(sorted(deps)) or '-'}")
+        return
+
+    stages = select_stages(STAGES, args.stages)
+    failed = run_pipeline(stages, workdir=args.workdir, jobs=args.jobs, force=args.force, dry_run=args.dry_run)
+    if failed:
+        sys.exit(f"Failed stage(s): {', '.join(failed)}")
+
+
+if __name__ == "__main__":
+    main()
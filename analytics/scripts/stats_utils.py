@@ -0,0 +1,335 @@
+import itertools
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.linalg import helmert
+from scipy.stats import chi2 as chi2_distribution
+from scipy.stats import (friedmanchisquare, kurtosis, kurtosistest, shapiro,
+                         skew, skewtest, wilcoxon)
+
+from pool_utils import resolve_workers
+
+# Columns of the tidy table returned by friedman_wilcoxon
+RESULT_COLUMNS = ["subset", "metric", "test", "comparison", "n", "statistic", "p_uncorrected", "p_holm", "significant"]
+
+# Columns of the tidy table returned by normality_diagnostics
+DIAGNOSTIC_COLUMNS = ["dataset", "subset", "metric", "interface", "test", "n", "statistic", "chi2", "dof",
+                      "p_value", "significant"]
+
+# Samples tested per call (and per worker task) of normality_diagnostics
+CELLS_PER_TASK = 256
+
+
+def holm(p_values, alpha=0.05):
+    """Holm step-down correction applied to every row of a (families x tests) p-value array.
+
+    Returns (reject, p_holm) with the same results as statsmodels'
+    multipletests(method="holm") run on each row separately.
+    """
+    p_values = np.atleast_2d(np.asarray(p_values, dtype=float))
+    order = np.argsort(p_values, axis=1)
+    p_sorted = np.take_along_axis(p_values, order, axis=1)
+    factors = np.arange(p_values.shape[1], 0, -1)
+
+    reject_sorted = np.logical_and.accumulate(p_sorted <= alpha / factors, axis=1)
+    p_holm_sorted = np.minimum(np.maximum.accumulate(p_sorted * factors, axis=1), 1)
+
+    reject = np.empty_like(reject_sorted)
+    p_holm = np.empty_like(p_holm_sorted)
+    np.put_along_axis(reject, order, reject_sorted, axis=1)
+    np.put_along_axis(p_holm, order, p_holm_sorted, axis=1)
+    return reject, p_holm
+
+
+def _cube_array(means, metrics, conditions, condition):
+    """(subjects x metrics x conditions) array of rows averaged per (subject, condition)."""
+    means = means.unstack(condition).reindex(columns=pd.MultiIndex.from_product([metrics, conditions]))
+    return means.to_numpy(dtype=float).reshape(len(means), len(metrics), len(conditions))
+
+
+def condition_cube(df, metrics, conditions, subject="session_id", condition="interface_option"):
+    """Average the rows per subject and condition into a (subjects x metrics x conditions) array."""
+    return _cube_array(df.groupby([subject, condition])[metrics].mean(), metrics, conditions, condition)
+
+
+def task_type_slices(df, all_label="all", task_types=("exploratory", "goal")):
+    """Row masks of every task and of each task type, e.g. for MetricCube or friedman_wilcoxon subsets."""
+    return {
+        all_label: pd.Series(True, index=df.index),
+        **{task_type: df["task_type"] == task_type for task_type in task_types},
+    }
+
+
+class MetricCube:
+    """Task metrics split once by slice (e.g. task type), condition and metric.
+
+    `slices` maps labels to row masks of `df` (default: task_type_slices).
+    For every slice it keeps the rows of each (metric, condition) cell as a
+    NumPy array, and the rows averaged per subject and condition, from which
+    the (subjects x metrics x conditions) array of condition_cube and
+    per-metric wide tables (subjects x conditions, as pivot_table) are built
+    on first use and cached.
+    """
+
+    def __init__(self, df, metrics, conditions, slices=None, subject="session_id", condition="interface_option"):
+        self.metrics = list(metrics)
+        self.conditions = list(conditions)
+        self.slices = task_type_slices(df) if slices is None else slices
+        self.condition = condition
+        self._samples = {}
+        self._means = {}
+        self._cubes = {}
+        self._wide = {}
+
+        empty = np.empty((0, len(self.metrics)))
+        for label, mask in self.slices.items():
+            rows = df[mask]
+            groups = rows.groupby(condition, sort=False).indices
+            for value in self.conditions:
+                cell = rows[self.metrics].iloc[groups[value]].to_numpy(dtype=float) if value in groups else empty
+                for j, metric in enumerate(self.metrics):
+                    self._samples[label, metric, value] = cell[:, j]
+            self._means[label] = rows.groupby([subject, condition])[self.metrics].mean()
+
+    def sample(self, label, metric, condition):
+        """Values of `metric` in the rows of one slice and condition, in row order."""
+        return self._samples[label, metric, condition]
+
+    def cube(self, label):
+        """The (subjects x metrics x conditions) array of per-subject averages of a slice."""
+        if label not in self._cubes:
+            self._cubes[label] = _cube_array(self._means[label], self.metrics, self.conditions, self.condition)
+        return self._cubes[label]
+
+    def wide(self, label, metric):
+        """Per-subject averages of `metric` (subjects x the conditions present, in sorted
+        order), without the subjects missing a condition."""
+        key = (label, metric)
+        if key not in self._wide:
+            self._wide[key] = self._means[label][metric].unstack(self.condition).dropna()
+        return self._wide[key]
+
+
+def _has_ties_or_zeros(d):
+    """Per column of paired differences: does the exact Wilcoxon distribution not apply?"""
+    magnitudes = np.sort(np.abs(d), axis=0)
+    return (magnitudes[0] == 0) | (np.diff(magnitudes, axis=0) == 0).any(axis=0)
+
+
+def _batched_wilcoxon(x, y):
+    """wilcoxon(x[:, j], y[:, j]) for every column j, in as few calls as possible.
+
+    scipy picks the exact or the normal approximation from the ties and zeros
+    of a whole batch, so columns are batched by that choice to get the
+    p-values of separate calls.
+    """
+    statistic = np.full(x.shape[1], np.nan)
+    p_value = np.full(x.shape[1], np.nan)
+    inexact = _has_ties_or_zeros(x - y)
+    for columns in (np.flatnonzero(~inexact), np.flatnonzero(inexact)):
+        if columns.size:
+            result = wilcoxon(x[:, columns], y[:, columns], axis=0)
+            statistic[columns] = result.statistic
+            p_value[columns] = result.pvalue
+    return statistic, p_value
+
+
+def friedman_wilcoxon(df, metrics, conditions, subsets=None, subject="session_id",
+                      condition="interface_option", alpha=0.05, cube=None):
+    """Friedman omnibus tests with Holm-corrected pairwise Wilcoxon post-hoc tests.
+
+    `df` is long-format (one row per subject, condition and possibly task);
+    rows are averaged per subject and condition first. `subsets` maps labels
+    to row masks of `df` (default: one subset "all" with every row). Each
+    metric only keeps the subjects with values for all conditions.
+
+    All tests are computed at once for every subset and metric. The post-hoc
+    tests of a metric are reported only when its Friedman p < alpha, with the
+    Holm correction applied over its condition pairs. Returns a tidy table
+    with one "friedman" row per subset and metric followed by its "wilcoxon" rows.
+
+    With a MetricCube of `df` (same metrics and conditions), its per-subject
+    averages are reused and its slices are the default subsets.
+    """
+    if subsets is None:
+        subsets = cube.slices if cube is not None else {"all": np.ones(len(df), dtype=bool)}
+    pairs = list(itertools.combinations(range(len(conditions)), 2))
+
+    # One family per (subset, metric), stacked along the second axis
+    if cube is not None:
+        cubes = [cube.cube(label) for label in subsets]
+    else:
+        cubes = [condition_cube(df[mask], metrics, conditions, subject, condition) for mask in subsets.values()]
+    n_subjects = max(cube.shape[0] for cube in cubes)
+    cube = np.concatenate(
+        [np.pad(c, ((0, n_subjects - c.shape[0]), (0, 0), (0, 0)), constant_values=np.nan) for c in cubes],
+        axis=1,
+    )
+    n_families = cube.shape[1]
+
+    n = np.zeros(n_families, dtype=int)
+    chi2 = np.full(n_families, np.nan)
+    p_friedman = np.full(n_families, np.nan)
+    w = np.full((n_families, len(pairs)), np.nan)
+    p_wilcoxon = np.full((n_families, len(pairs)), np.nan)
+
+    # Families with the same complete subjects are tested together
+    complete = ~np.isnan(cube).any(axis=2)
+    patterns, pattern_of_family = np.unique(complete.T, axis=0, return_inverse=True)
+    for pattern, rows in enumerate(patterns):
+        families = np.flatnonzero(pattern_of_family.ravel() == pattern)
+        if not rows.any():
+            continue
+        sample = cube[rows][:, families, :]
+        n[families] = rows.sum()
+        result = friedmanchisquare(*np.moveaxis(sample, 2, 0), axis=0)
+        chi2[families], p_friedman[families] = result.statistic, result.pvalue
+        for j, (a, b) in enumerate(pairs):
+            w[families, j], p_wilcoxon[families, j] = _batched_wilcoxon(sample[:, :, a], sample[:, :, b])
+
+    reject, p_holm = holm(p_wilcoxon, alpha=alpha)
+
+    results = []
+    labels = [(label, metric) for label in subsets for metric in metrics]
+    for family, (label, metric) in enumerate(labels):
+        if n[family] == 0:
+            continue
+        results.append((label, metric, "friedman", None, n[family], chi2[family], p_friedman[family],
+                        None, p_friedman[family] < alpha))
+        if p_friedman[family] < alpha:
+            for j, (a, b) in enumerate(pairs):
+                results.append((label, metric, "wilcoxon", f"{conditions[a]} vs {conditions[b]}", n[family],
+                                w[family, j], p_wilcoxon[family, j], p_holm[family, j], reject[family, j]))
+    return pd.DataFrame(results, columns=RESULT_COLUMNS)
+
+
+def normality_tests(values):
+    """Shapiro-Wilk, skewness and excess kurtosis tests of every row of a
+    (cells x values) array padded with NaN, one scipy call per test.
+
+    Returns {test: (statistic, p_value)} for "shapiro", "skewness" (with
+    D'Agostino's skewtest) and "kurtosis" (with the Anscombe-Glynn
+    kurtosistest), and the sample size of every row. Rows too small for a
+    test (3, 8 and 5 values) get NaN p-values.
+    """
+    n = (~np.isnan(values)).sum(axis=1)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")  # too small samples give NaN and a warning
+        results = {
+            "shapiro": shapiro(values, axis=1, nan_policy="omit"),
+            "skewness": (skew(values, axis=1, nan_policy="omit"), skewtest(values, axis=1, nan_policy="omit").pvalue),
+            "kurtosis": (kurtosis(values, axis=1, nan_policy="omit"),
+                         kurtosistest(values, axis=1, nan_policy="omit").pvalue),
+        }
+    results = {test: (np.asarray(statistic, dtype=float), np.asarray(p, dtype=float))
+               for test, (statistic, p) in results.items()}
+    results["skewness"][0][n < 3] = np.nan
+    results["kurtosis"][0][n < 4] = np.nan
+    return results, n
+
+
+def _normality_chunk(samples):
+    """normality_tests of a list of samples; a module-level function so it can run in a worker process."""
+    values = np.full((len(samples), max(len(sample) for sample in samples)), np.nan)
+    for i, sample in enumerate(samples):
+        values[i, :len(sample)] = sample
+    return normality_tests(values)
+
+
+def mauchly(cube):
+    """Mauchly's test of sphericity of every family of a (subjects x families x
+    conditions) array, on the subjects with values for all conditions.
+
+    Families with the same complete subjects share one batched covariance.
+    Returns (W, chi2, dof, p_value, n) arrays with the values of
+    pingouin.sphericity; with two conditions sphericity always holds (W = 1, p = 1).
+    """
+    n_families, k = cube.shape[1], cube.shape[2]
+    d = k - 1
+    dof = d * (d + 1) / 2 - 1
+    n = np.zeros(n_families, dtype=int)
+    w = np.full(n_families, np.nan)
+    chi2 = np.full(n_families, np.nan)
+    p_value = np.full(n_families, np.nan)
+
+    # Orthonormal contrasts: W does not depend on which ones are used
+    contrasts = helmert(k).T if d else np.empty((k, 0))
+    complete = ~np.isnan(cube).any(axis=2)
+    patterns, pattern_of_family = np.unique(complete.T, axis=0, return_inverse=True)
+    for pattern, rows in enumerate(patterns):
+        families = np.flatnonzero(pattern_of_family.ravel() == pattern)
+        n_subjects = rows.sum()
+        n[families] = n_subjects
+        if n_subjects < 2 or d < 1:
+            continue
+        if d == 1:
+            w[families], chi2[families], p_value[families] = 1.0, 0.0, 1.0
+            continue
+        sample = cube[rows][:, families, :] @ contrasts
+        centered = sample - sample.mean(axis=0)
+        covariance = np.einsum("sfi,sfj->fij", centered, centered) / (n_subjects - 1)
+        sign, logdet = np.linalg.slogdet(covariance)
+        trace = np.trace(covariance, axis1=1, axis2=2)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            log_w = np.where(sign > 0, logdet - d * np.log(trace / d), -np.inf)
+
+            # Chi-square approximation with the second-order correction, as pingouin and R
+            df = n_subjects - 1
+            f = 1 - (2 * d ** 2 + d + 2) / (6 * d * df)
+            w2 = (d + 2) * (d - 1) * (d - 2) * (2 * d ** 3 + 6 * d ** 2 + 3 * k + 2) / (288 * (df * d * f) ** 2)
+            statistic = -df * f * log_w
+            p1 = chi2_distribution.sf(statistic, dof)
+            p2 = chi2_distribution.sf(statistic, dof + 4)
+        w[families] = np.exp(log_w)
+        chi2[families] = statistic
+        p_value[families] = np.clip(p1 + w2 * (p2 - p1), 0, 1)
+    return w, chi2, dof, p_value, n
+
+
+def normality_diagnostics(cubes, workers=1, alpha=0.05):
+    """Shapiro-Wilk, skewness, kurtosis and Mauchly tests of every cell of MetricCubes.
+
+    `cubes` maps dataset labels to MetricCubes. The rows of every (dataset,
+    slice, metric, condition) cell are tested with normality_tests, in
+    batches of CELLS_PER_TASK cells that are spread over `workers` processes
+    when there are several. Mauchly's test is run on the per-subject averages
+    of every (dataset, slice, metric) with mauchly. Returns a tidy table with
+    one row per cell and test ("interface" is empty for Mauchly's test, whose
+    statistic is W, with its chi-square approximation in "chi2") and
+    "significant" for p < alpha, i.e. a departure from normality or sphericity.
+    """
+    cells = [(dataset, label, metric, condition)
+             for dataset, cube in cubes.items()
+             for label in cube.slices for metric in cube.metrics for condition in cube.conditions]
+    tasks = [[cubes[dataset].sample(label, metric, condition) for dataset, label, metric, condition in
+              cells[start:start + CELLS_PER_TASK]] for start in range(0, len(cells), CELLS_PER_TASK)]
+
+    workers = resolve_workers(workers)
+    if workers == 1 or len(tasks) <= 1:
+        chunk_results = [_normality_chunk(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunk_results = list(pool.map(_normality_chunk, tasks))
+
+    results = []
+    offsets = range(0, len(cells), CELLS_PER_TASK)
+    for start, (tests, n) in zip(offsets, chunk_results):
+        for i, (dataset, label, metric, condition) in enumerate(cells[start:start + len(n)]):
+            for test, (statistic, p_value) in tests.items():
+                results.append((dataset, label, metric, condition, test, n[i], statistic[i], None, None,
+                                p_value[i], p_value[i] < alpha))
+
+    for dataset, cube in cubes.items():
+        labels = [(label, metric) for label in cube.slices for metric in cube.metrics]
+        averages = [cube.cube(label) for label in cube.slices]
+        n_subjects = max(a.shape[0] for a in averages)
+        w, chi2, dof, p_value, n = mauchly(np.concatenate(
+            [np.pad(a, ((0, n_subjects - a.shape[0]), (0, 0), (0, 0)), constant_values=np.nan) for a in averages],
+            axis=1,
+        ))
+        for family, (label, metric) in enumerate(labels):
+            results.append((dataset, label, metric, None, "mauchly", n[family], w[family], chi2[family], dof,
+                            p_value[family], p_value[family] < alpha))
+    return pd.DataFrame(results, columns=DIAGNOSTIC_COLUMNS)
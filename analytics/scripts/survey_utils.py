@@ -0,0 +1,107 @@
+import cache_utils
+import export_utils
+from cache_utils import SessionCache, content_hash, file_hash, source_hash
+from export_utils import get_steps, iter_sessions, latest_export_of, map_exports
+
+# Survey events that only record UI usage, not answers
+SURVEY_METRIC_TARGETS = {"infoButton", "previewToggleButton"}
+
+# Cached records are only reused by the extraction code (including the export
+# traversal and the cache format) that produced them
+SURVEY_CACHE_NAMESPACE = f"surveys:{source_hash(__file__, export_utils.__file__, cache_utils.__file__)}"
+
+
+def extract_session_survey_records(session_id, session_content):
+    """Split the survey events of one session into (post_interface, final, metrics) records."""
+    post_interface_surveys = []
+    final_surveys = []
+    surveys_metrics = []
+
+    for step_id, step in get_steps(session_content).items():
+        if step.get("taskType") == "survey":
+            events = step.get("events", [])
+            for event in events:
+                details = event.get("details", {})
+                target = details.get("targetType")
+
+                record = {
+                    "session_id": session_id,
+                    "step_id": step_id,
+                    "interface_option": step.get("interfaceOption"),
+                    "interface_order": step.get("interfaceOrder"),
+                    "responses": details
+                }
+
+                if target in SURVEY_METRIC_TARGETS or details.get("to") == "pageRefresh":
+                    surveys_metrics.append(record)
+                else:
+                    if step.get("interfaceOption"):
+                        post_interface_surveys.append(record)
+                    else:
+                        final_surveys.append(record)
+
+    return post_interface_surveys, final_surveys, surveys_metrics
+
+
+def extract_survey_records(file_path, cache=None):
+    """Split the survey events of one export into (post_interface, final, metrics) records.
+
+    Returns the three record lists and the ids of every session in the export.
+    With a SessionCache, unchanged sessions reuse their cached records.
+    """
+    records = ([], [], [])
+    session_ids = []
+
+    for session_id, session_content in iter_sessions(file_path):
+        session_ids.append(session_id)
+        session_records = None
+        if cache is not None:
+            session_hash = content_hash(session_content)
+            session_records = cache.get(session_id, session_hash)
+        if session_records is None:
+            session_records = extract_session_survey_records(session_id, session_content)
+            if cache is not None:
+                cache.put(session_id, session_hash, session_records)
+
+        for all_records, new_records in zip(records, session_records):
+            all_records.extend(new_records)
+
+    return records, session_ids
+
+
+def _extract_export(file_path, cache_path):
+    if cache_path is None:
+        return extract_survey_records(file_path)
+
+    with SessionCache(cache_path, SURVEY_CACHE_NAMESPACE) as cache:
+        # An unchanged export is served from the cache without parsing it
+        export_hash = file_hash(file_path)
+        cached_export = cache.get_export(export_hash)
+        if cached_export is not None:
+            records = ([], [], [])
+            for _, session_records in cached_export:
+                for all_records, new_records in zip(records, session_records):
+                    all_records.extend(new_records)
+            return records, [session_id for session_id, _ in cached_export]
+
+        result = extract_survey_records(file_path, cache)
+        cache.put_export(export_hash)
+        return result
+
+
+def extract_survey_records_from_exports(file_paths, workers=None, cache_path=None):
+    """Extract several exports in a process pool and concatenate their records in file order.
+
+    A session present in several exports keeps the records of the last one
+    (see latest_export_of), in all three record lists.
+    With `cache_path`, only new or changed sessions are re-extracted.
+    """
+    results = map_exports(_extract_export, file_paths, [cache_path] * len(file_paths), workers=workers)
+    latest = latest_export_of(session_ids for _, session_ids in results)
+
+    records = ([], [], [])
+    for index, (export_records, _) in enumerate(results):
+        for all_records, new_records in zip(records, export_records):
+            all_records.extend(record for record in new_records if latest[record["session_id"]] == index)
+
+    return records
@@ -1,23 +1,22 @@
-import ast
+import os
+import sys
 
 import matplotlib.pyplot as plt
-import pandas as pd
 import seaborn as sns
 
-# Load the cleaned post-interface survey data
-df = pd.read_csv("survey_post_interface_clean.csv")
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from table_utils import SurveyAnswers
 
-# Safely parse each stringified list of dicts into actual Python objects
-df["quantitative"] = df["quantitative"].apply(lambda x: ast.literal_eval(x) if pd.notnull(x) else [])
+# Load the common quantitative answers of the post-interface surveys
+items = ["ease", "fun", "helpful", "useful"]
+answers = SurveyAnswers.load(
+    filters=[("survey", "=", "post_interface"), ("kind", "=", "quantitative"), ("question_id", "in", items)],
+    values=["answer_number"],
+    index=["session_id", "interface_option"],
+)
 
-# Turn the list of quantitative answers into a flat dictionary: {'ease': 6, 'fun': 5, ...}
-def extract_quant_responses(quant_list):
-    return {q['questionId']: q['answer'] for q in quant_list}
-
-quant_df = df["quantitative"].apply(extract_quant_responses).apply(pd.Series)
-
-# Merge back with interface option
-df_quant = pd.concat([df["interface_option"], quant_df], axis=1)
+# One row per survey with one column per question: {'ease': 6, 'fun': 5, ...}
+df_quant = answers.questions(items, values="answer_number").reset_index()
 
 # Standardize column order
 columns = ["interface_option", "ease", "fun", "helpful", "useful"]
@@ -1,74 +1,56 @@
-import ast
-import itertools
+import os
+import sys
 
 import pandas as pd
-from scipy.stats import friedmanchisquare, wilcoxon
-from statsmodels.stats.multitest import multipletests
 
-# === Load and parse the cleaned post-interface survey data ===
-df = pd.read_csv("survey_post_interface_clean.csv")
-
-# Safely parse each stringified list of dicts into actual Python objects
-df["quantitative"] = df["quantitative"].apply(lambda x: ast.literal_eval(x) if pd.notnull(x) else [])
-
-# Extract the quantitative answers into flat columns
-def extract_quant_responses(quant_list):
-    return {q["questionId"]: q["answer"] for q in quant_list}
-
-quant_df = df["quantitative"].apply(extract_quant_responses).apply(pd.Series)
-
-# Merge with session_id and interface_option
-df_quant = pd.concat([df[["session_id", "interface_option"]], quant_df], axis=1)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from stats_utils import friedman_wilcoxon
+from table_utils import SurveyAnswers
 
 # === Setup ===
 items = ["ease", "fun", "helpful", "useful"]
 interfaces = ["benchmark", "single", "multi"]
 alpha = 0.05
 
+# === Load the common quantitative answers of the post-interface surveys ===
+answers = SurveyAnswers.load(
+    filters=[("survey", "=", "post_interface"), ("kind", "=", "quantitative"), ("question_id", "in", items)],
+    values=["answer_number"],
+    index=["session_id", "interface_option"],
+)
+
+# One row per session and interface with the answers in flat columns
+df_quant = answers.questions(items, values="answer_number").reset_index()
+
+# === Run all tests in one batch ===
+tests = friedman_wilcoxon(df_quant, items, interfaces, alpha=alpha)
+
 friedman_results = []
 wilcoxon_all = []
 
-# === Run tests per item ===
-for item in items:
+for item, item_tests in tests.groupby("metric", sort=False):
     print(f"\n=== {item.capitalize()} ===")
 
-    # Pivot: one row per participant, one column per interface
-    wide_df = df_quant.pivot(index="session_id", columns="interface_option", values=item)
-
-    # Keep only participants with responses in all three conditions
-    wide_df = wide_df[interfaces].dropna()
-
-    # Friedman test
-    stat, p_friedman = friedmanchisquare(wide_df["benchmark"], wide_df["single"], wide_df["multi"])
+    omnibus = item_tests.iloc[0]
     friedman_results.append({
         "item": item,
-        "friedman_chi2": stat,
-        "friedman_p": p_friedman
+        "friedman_chi2": omnibus["statistic"],
+        "friedman_p": omnibus["p_uncorrected"]
     })
 
-    print(f"Friedman χ² = {stat:.3f}, p = {p_friedman:.4f}")
-
-    if p_friedman < alpha:
-        # Wilcoxon pairwise comparisons
-        pairs = list(itertools.combinations(interfaces, 2))
-        raw_p = []
-        results = []
-
-        for a, b in pairs:
-            w_stat, p_val = wilcoxon(wide_df[a], wide_df[b])
-            raw_p.append(p_val)
-            results.append((item, f"{a} vs {b}", w_stat, p_val))
+    print(f"Friedman χ² = {omnibus['statistic']:.3f}, p = {omnibus['p_uncorrected']:.4f}")
 
-        # Holm correction
-        reject, p_holm, _, _ = multipletests(raw_p, alpha=alpha, method="holm")
-        for i, (item, pair, w_stat, p_val) in enumerate(results):
+    posthoc = item_tests[item_tests["test"] == "wilcoxon"]
+    if not posthoc.empty:
+        # Wilcoxon pairwise comparisons (Holm-corrected)
+        for _, test in posthoc.iterrows():
             wilcoxon_all.append({
                 "item": item,
-                "pair": pair,
-                "W": w_stat,
-                "p_uncorrected": p_val,
-                "p_holm": p_holm[i],
-                "significant": reject[i]
+                "pair": test["comparison"],
+                "W": test["statistic"],
+                "p_uncorrected": test["p_uncorrected"],
+                "p_holm": test["p_holm"],
+                "significant": test["significant"]
             })
         print(pd.DataFrame(wilcoxon_all[-3:]))  # Just print the last 3 pairwise for this item
     else:
@@ -1,36 +1,26 @@
-import ast
+import os
+import sys
 
-import pandas as pd
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from table_utils import load_survey_answers
 
-# Load survey data
-df = pd.read_csv("survey_post_interface_clean.csv")
-
-# Parse the quantitative column from stringified JSON to list-of-dicts
-df["quantitative"] = df["quantitative"].apply(lambda x: ast.literal_eval(x) if pd.notnull(x) else [])
-
-# Flatten quantitative responses into rows per question
-rows = []
-for _, row in df.iterrows():
-    session = row["session_id"]
-    interface = row["interface_option"]
-    for q in row["quantitative"]:
-        rows.append({
-            "session_id": session,
-            "interface_option": interface,
-            "question_id": q["questionId"],
-            "answer": q["answer"]
-        })
-
-df_flat = pd.DataFrame(rows)
-
-# Filter only interface-specific questions based on ID prefixes
+# Interface-specific questions are recognized by their ID prefixes
 interface_question_prefixes = {
     "benchmark": "benchmark_",
     "single": "single_",
     "multi": "multi_"
 }
-df_flat = df_flat[df_flat["interface_option"].isin(interface_question_prefixes.keys())]
-df_flat = df_flat[df_flat.apply(lambda x: x["question_id"].startswith(interface_question_prefixes[x["interface_option"]]), axis=1)]
+
+# Load the quantitative post-interface answers (one row per question)
+df_flat = load_survey_answers(
+    columns=["session_id", "interface_option", "question_id", "answer_number"],
+    filters=[("survey", "=", "post_interface"), ("kind", "=", "quantitative"),
+             ("interface_option", "in", list(interface_question_prefixes))],
+).rename(columns={"answer_number": "answer"})
+
+# Filter only interface-specific questions based on ID prefixes
+df_flat = df_flat[[question_id.startswith(interface_question_prefixes[interface])
+                   for interface, question_id in zip(df_flat["interface_option"], df_flat["question_id"])]]
 
 # Compute mean and std per question
 summary = (
@@ -1,10 +1,12 @@
-import matplotlib.pyplot as plt
-import numpy as np
+import argparse
+import os
+import sys
+
 import pandas as pd
-import seaborn as sns
 
-# Load the CSV
-df = pd.read_csv("interface_specific_survey_question_stats.csv")
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from plot_utils import (Figure, add_figure_arguments, radar_chart,
+                        rating_heatmap, render_figures)
 
 # Map better item names for plotting
 label_map = {
@@ -30,29 +32,6 @@ label_map = {
     "single_title_filter_clear": "Title Filter Clear",
     "single_title_filter_intuitive": "Title Filter Intuitive"
 }
-df["item_label"] = df["question_id"].map(label_map)
-
-# Radar chart per interface
-grouped = df.groupby("interface_option")
-for interface in grouped.groups.keys():
-    subset = df[df["interface_option"] == interface]
-    labels = subset["item_label"].values
-    stats = subset["mean"].values
-    angles = np.linspace(0, 2 * np.pi, len(labels), endpoint=False).tolist()
-    stats = np.concatenate((stats, [stats[0]]))  # close the circle
-    angles += angles[:1]
-
-    fig, ax = plt.subplots(figsize=(6, 6), subplot_kw=dict(polar=True))
-    ax.plot(angles, stats, color="#006D77", linewidth=2)
-    ax.fill(angles, stats, color="#BCDEDC", alpha=0.25)
-    ax.set_yticks([1, 3, 5, 7])
-    ax.set_ylim(1, 7)
-    ax.set_title(f"{interface.capitalize()} Interface", size=14, pad=20)
-    ax.set_xticks(angles[:-1])
-    ax.set_xticklabels(labels, fontsize=9)
-    plt.tight_layout()
-    plt.savefig(f"radar_{interface}.png", dpi=300)
-    plt.close()
 
 # Map interface labels
 interface_label_map = {
@@ -60,25 +39,39 @@ interface_label_map = {
     "single": "Single-directional",
     "multi": "Multi-directional"
 }
-df["interface_label"] = df["interface_option"].map(interface_label_map)
 
-# Pivot and reindex columns to desired order
-heatmap_df = df.pivot(index="item_label", columns="interface_label", values="mean")
-heatmap_df = heatmap_df[["List", "Single-directional", "Multi-directional"]]
 
-# Plot heatmap
-plt.figure(figsize=(10, 10))
-sns.heatmap(
-    heatmap_df,
-    annot=True,
-    fmt=".2f",
-    cmap="YlGnBu",
-    vmin=1, vmax=7,
-    linewidths=0.5, linecolor='white',
-    cbar_kws={"label": "Mean Rating (1-7)"}
-)
-plt.title("Mean Ratings by Interface-specific Survey Items", fontsize=14, pad=12)
-plt.xlabel('')
-plt.ylabel('')
-plt.tight_layout()
-plt.savefig("interface_specific_items_heatmap.png", dpi=300)
+def main():
+    parser = argparse.ArgumentParser(description="Render radar charts and a heatmap of the interface-specific items.")
+    add_figure_arguments(parser)
+    args = parser.parse_args()
+
+    # Load the CSV
+    df = pd.read_csv("interface_specific_survey_question_stats.csv")
+    df["item_label"] = df["question_id"].map(label_map)
+
+    # Radar chart per interface
+    figures = []
+    grouped = df.groupby("interface_option")
+    for interface in grouped.groups.keys():
+        subset = df[df["interface_option"] == interface]
+        figures.append(Figure(
+            f"radar_{interface}.png", radar_chart, pd.Series(subset["mean"].values, index=subset["item_label"].values),
+            {"title": f"{interface.capitalize()} Interface"}, {"dpi": 300},
+        ))
+
+    df["interface_label"] = df["interface_option"].map(interface_label_map)
+
+    # Heatmap of items by interfaces, columns in the desired order
+    figures.append(Figure(
+        "interface_specific_items_heatmap.png", rating_heatmap, df[["item_label", "interface_label", "mean"]],
+        {"title": "Mean Ratings by Interface-specific Survey Items",
+         "columns": ["List", "Single-directional", "Multi-directional"]},
+        {"dpi": 300},
+    ))
+
+    render_figures(figures, workers=args.workers, force=args.force)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,10 @@
-import ast
 import os
+import sys
 
 import pandas as pd
 
-# Load survey data
-df = pd.read_csv("survey_post_interface_clean.csv")
-
-# Parse qualitative column from stringified JSON to list-of-dicts
-df["qualitative"] = df["qualitative"].apply(lambda x: ast.literal_eval(x) if pd.notnull(x) else [])
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from table_utils import load_survey_answers
 
 # Interface-specific qualitative question ID prefixes
 interface_qual_ids = {
@@ -25,22 +22,16 @@ interface_qual_ids = {
     ]
 }
 
-# Flatten qualitative feedback into rows
-rows = []
-for _, row in df.iterrows():
-    session = row["session_id"]
-    interface = row["interface_option"]
-    for q in row["qualitative"]:
-        qid = q["questionId"]
-        if qid in interface_qual_ids.get(interface, []):
-            rows.append({
-                "session_id": session,
-                "interface_option": interface,
-                "question_id": qid,
-                "answer": q["answer"]
-            })
+# Load the qualitative feedback (one row per question)
+df_qual = load_survey_answers(
+    columns=["session_id", "interface_option", "question_id", "answer_text"],
+    filters=[("survey", "=", "post_interface"), ("kind", "=", "qualitative"),
+             ("question_id", "in", [qid for qids in interface_qual_ids.values() for qid in qids])],
+).rename(columns={"answer_text": "answer"})
 
-df_qual = pd.DataFrame(rows)
+# Keep the questions of the interface the survey was about
+interface_qual_pairs = [(interface, qid) for interface, qids in interface_qual_ids.items() for qid in qids]
+df_qual = df_qual[pd.MultiIndex.from_frame(df_qual[["interface_option", "question_id"]]).isin(interface_qual_pairs)]
 
 # Save to CSV (one file per interface for clarity)
 output_dir = "qualitative_feedback_by_interface"
@@ -1,36 +1,21 @@
-import ast
+import os
+import sys
 
-import pandas as pd
-
-# Load the survey data
-df = pd.read_csv("survey_final_clean.csv")
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from table_utils import load_survey_answers
 
 # Define which questionIds to keep
-desired_question_ids = {"favoriteWhy", "realWhy", "feedback"}
-
-# Helper function to extract desired qualitative responses
-def extract_selected_feedback(row):
-    raw = row.get("qualitative")
-    if pd.isna(raw):
-        return []
-    try:
-        raw = raw.replace('""', '"')  # fix escaped quotes
-        entries = ast.literal_eval(raw)
-        return [
-            (row["session_id"], q["questionId"], q["answer"].strip())
-            for q in entries
-            if q["questionId"] in desired_question_ids and q["answer"].strip()
-        ]
-    except Exception:
-        return []
+desired_question_ids = ["favoriteWhy", "realWhy", "feedback"]
 
-# Flatten all selected feedback
-all_feedback = []
-for _, row in df.iterrows():
-    all_feedback.extend(extract_selected_feedback(row))
+# Load the selected qualitative responses of the final survey
+feedback_df = load_survey_answers(
+    columns=["session_id", "question_id", "answer_text"],
+    filters=[("survey", "=", "final"), ("kind", "=", "qualitative"), ("question_id", "in", desired_question_ids)],
+).rename(columns={"answer_text": "answer"})
 
-# Create DataFrame
-feedback_df = pd.DataFrame(all_feedback, columns=["session_id", "question_id", "answer"])
+# Keep only non-empty answers
+feedback_df["answer"] = feedback_df["answer"].str.strip()
+feedback_df = feedback_df[feedback_df["answer"].fillna("") != ""]
 
 # Save to CSV
 feedback_df.to_csv("final_survey_open_feedback.csv", index=False)
@@ -1,51 +1,23 @@
-import ast
 import os
+import sys
 
 import matplotlib.pyplot as plt
 import pandas as pd
 import seaborn as sns
 
-# Load the survey data
-df = pd.read_csv("survey_final_clean.csv")
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from table_utils import SurveyAnswers
+
+# Index the final survey answers by session and question
+answers = SurveyAnswers.load(filters=[("survey", "=", "final")], values=["answer_number", "answer_text"])
 
 # Create a directory for plots
 output_dir = "demographics_plots"
 os.makedirs(output_dir, exist_ok=True)
 
-# Function to extract specific qualitative answers
-def extract_answer(row, question_id):
-    raw = row.get('qualitative')
-    if pd.isna(raw):
-        return None
-    try:
-        raw = raw.replace('""', '"')
-        qa_list = ast.literal_eval(raw)
-    except (ValueError, SyntaxError):
-        return None
-    for qa in qa_list:
-        if qa.get('questionId') == question_id:
-            return qa.get('answer')
-    return None
-
-# Function to extract specific quantitative answers
-def extract_answer_quan(row, question_id):
-    raw = row.get('quantitative')
-    if pd.isna(raw):
-        return None
-    try:
-        raw = raw.replace('""', '"')
-        qa_list = ast.literal_eval(raw)
-    except (ValueError, SyntaxError):
-        return None
-    for qa in qa_list:
-        if qa.get('questionId') == question_id:
-            return qa.get('answer')
-    return None
-
-# Extract demographic answers
-df['age'] = df.apply(lambda r: extract_answer_quan(r, 'age'), axis=1)
-df['gender'] = df.apply(lambda r: extract_answer(r, 'sex'), axis=1)
-df['travel_freq'] = df.apply(lambda r: extract_answer(r, 'travelFrequency'), axis=1)
+# Extract demographic answers, one row per session
+demographic_questions = {"age": "age", "sex": "gender", "travelFrequency": "travel_freq"}
+df = answers.questions(demographic_questions).rename(columns=demographic_questions)
 
 # Calculate response rate
 total_sessions = df.shape[0]
@@ -67,7 +39,7 @@ response_summary.to_csv("demographic_data_summary.csv", index=False)
 print("Saved demographic data to 'demographic_data_summary.csv'")
 
 # Prepare age plot
-df['age'] = pd.to_numeric(df['age'], errors='coerce')
+df['age'] = answers.question('age', values="answer_number")
 plt.figure(figsize=(6, 4))
 sns.violinplot(y=df['age'].dropna(), color="#BCDEDC", inner="quartile")
 plt.title("Age Distribution of Participants")
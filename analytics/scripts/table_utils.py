@@ -0,0 +1,353 @@
+import ast
+import json
+import math
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+# Typed schema of the cleaned task tables (one row per goal/exploratory task)
+TASK_SCHEMA = pa.schema([
+    ("session_id", pa.string()),
+    ("step_id", pa.string()),
+    ("interface_option", pa.string()),
+    ("task_type", pa.string()),
+    ("task_completion_time_sec", pa.float64()),
+    ("total_interactions", pa.int64()),
+    ("total_navigations", pa.int64()),
+    ("total_filters", pa.int64()),
+    ("total_resets", pa.int64()),
+    ("total_hovers", pa.int64()),
+    ("total_scrolls", pa.int64()),
+    ("selected_accommodation_id", pa.string()),
+    ("selected_price", pa.float64()),
+    ("selected_rating", pa.float64()),
+    ("selected_distance", pa.float64()),
+    ("selected_type", pa.string()),
+    ("selected_features", pa.list_(pa.string())),
+])
+
+# Typed schema of the flat event table (one row per event recorded during a task)
+EVENT_SCHEMA = pa.schema([
+    ("session_id", pa.string()),
+    ("step_id", pa.string()),
+    ("interface_option", pa.string()),
+    ("task_type", pa.string()),
+    ("event_index", pa.int32()),
+    ("type", pa.string()),
+    ("timestamp", pa.int64()),
+    ("target_type", pa.string()),
+    ("to", pa.string()),
+    ("go_to", pa.bool_()),
+    ("accommodation_id", pa.string()),
+])
+
+# Typed schema of the survey answer table (one row per answered question). Numeric
+# answers (and numeric strings) fill answer_number, string answers answer_text and
+# list answers (including JSON-encoded ones, such as the ranking) answer_list
+SURVEY_ANSWER_SCHEMA = pa.schema([
+    ("session_id", pa.string()),
+    ("step_id", pa.string()),
+    ("interface_option", pa.string()),
+    ("interface_order", pa.list_(pa.string())),
+    ("survey", pa.string()),
+    ("kind", pa.string()),
+    ("question_id", pa.string()),
+    ("answer_number", pa.float64()),
+    ("answer_text", pa.string()),
+    ("answer_list", pa.list_(pa.string())),
+])
+
+# Answer lists of a survey response, in the order of their rows
+SURVEY_ANSWER_KINDS = ["quantitative", "qualitative"]
+
+# Cleaned survey CSVs the answer table is rebuilt from when it does not exist yet
+SURVEY_CSVS = {"post_interface": "survey_post_interface_clean.csv", "final": "survey_final_clean.csv"}
+
+
+def normalize_accommodation(accommodation):
+    """Flatten a booked accommodation dict into the selected_* task table columns."""
+    if not isinstance(accommodation, dict):
+        accommodation = {}
+    return {
+        "selected_accommodation_id": accommodation.get("id"),
+        "selected_price": accommodation.get("price"),
+        "selected_rating": accommodation.get("rating"),
+        "selected_distance": accommodation.get("distance"),
+        "selected_type": accommodation.get("type"),
+        "selected_features": accommodation.get("features"),
+    }
+
+
+def to_task_frame(task_metrics):
+    """Replace the selected_accommodation dicts by typed accommodation columns."""
+    accommodation = pd.DataFrame(
+        [normalize_accommodation(a) for a in task_metrics["selected_accommodation"]],
+        index=task_metrics.index,
+    )
+    task_frame = pd.concat([task_metrics.drop(columns=["selected_accommodation"]), accommodation], axis=1)
+    return task_frame[TASK_SCHEMA.names]
+
+
+def write_task_table(task_metrics, path):
+    """Write task metric rows (as produced by the extractors) to a typed Parquet table."""
+    table = pa.Table.from_pandas(to_task_frame(task_metrics), schema=TASK_SCHEMA, preserve_index=False)
+    pq.write_table(table, path)
+
+
+def load_task_table(name, columns=None):
+    """Load `<name>.parquet` (only the requested columns), or normalize `<name>.csv` if no table exists yet."""
+    parquet_path = f"{name}.parquet"
+    if os.path.exists(parquet_path):
+        return pq.read_table(parquet_path, columns=columns, memory_map=True).to_pandas()
+
+    task_metrics = pd.read_csv(f"{name}.csv")
+    task_metrics["selected_accommodation"] = task_metrics["selected_accommodation"].apply(
+        lambda x: ast.literal_eval(x) if pd.notnull(x) else None
+    )
+    task_frame = to_task_frame(task_metrics)
+    return task_frame[columns] if columns is not None else task_frame
+
+
+def typed_answer(answer):
+    """Split a raw survey answer into (answer_number, answer_text, answer_list)."""
+    number = text = items = None
+    if isinstance(answer, (int, float)) and not isinstance(answer, bool):
+        number = float(answer)
+    elif isinstance(answer, str):
+        text = answer
+        try:
+            number = float(answer)
+        except ValueError:
+            pass
+        if answer.lstrip().startswith("["):
+            try:
+                decoded = json.loads(answer)
+            except ValueError:
+                decoded = None
+            if isinstance(decoded, list):
+                items = [str(item) for item in decoded]
+    elif isinstance(answer, list):
+        text = json.dumps(answer)
+        items = [str(item) for item in answer]
+    if number is not None and not math.isfinite(number):
+        number = None
+    return number, text, items
+
+
+def survey_answer_rows(surveys, survey):
+    """Yield one SURVEY_ANSWER_SCHEMA row per answer of cleaned survey records
+    (rows with session_id, step_id, interface_option, interface_order and responses)."""
+    for record in surveys.itertuples(index=False):
+        responses = record.responses if isinstance(record.responses, dict) else {}
+        interface_option = record.interface_option if pd.notnull(record.interface_option) else None
+        interface_order = list(record.interface_order) if isinstance(record.interface_order, list) else None
+        for kind in SURVEY_ANSWER_KINDS:
+            answers = responses.get(kind)
+            for answer in answers if isinstance(answers, list) else []:
+                number, text, items = typed_answer(answer.get("answer"))
+                yield {
+                    "session_id": record.session_id,
+                    "step_id": record.step_id,
+                    "interface_option": interface_option,
+                    "interface_order": interface_order,
+                    "survey": survey,
+                    "kind": kind,
+                    "question_id": answer.get("questionId"),
+                    "answer_number": number,
+                    "answer_text": text,
+                    "answer_list": items,
+                }
+
+
+def survey_answer_table(surveys):
+    """Typed answer table of {survey: cleaned survey records}."""
+    rows = [row for survey, records in surveys.items() for row in survey_answer_rows(records, survey)]
+    return pa.Table.from_pylist(rows, schema=SURVEY_ANSWER_SCHEMA)
+
+
+def write_survey_answers(surveys, path):
+    """Write the answers of {survey: cleaned survey records} to a typed Parquet table."""
+    pq.write_table(survey_answer_table(surveys), path)
+
+
+def load_survey_answers(name="survey_answers", columns=None, filters=None):
+    """Load `<name>.parquet` (only the requested columns and the rows matching the
+    pyarrow `filters`), or rebuild it from the cleaned survey CSVs if no table exists yet."""
+    parquet_path = f"{name}.parquet"
+    if os.path.exists(parquet_path):
+        return pq.read_table(parquet_path, columns=columns, filters=filters, memory_map=True).to_pandas()
+
+    surveys = {}
+    for survey, csv_path in SURVEY_CSVS.items():
+        records = pd.read_csv(csv_path)
+        for column in ["interface_order"] + SURVEY_ANSWER_KINDS:
+            records[column] = records[column].apply(lambda x: ast.literal_eval(x) if pd.notnull(x) else None)
+        records["responses"] = [dict(zip(SURVEY_ANSWER_KINDS, answers))
+                                for answers in zip(*(records[kind] for kind in SURVEY_ANSWER_KINDS))]
+        surveys[survey] = records
+    table = survey_answer_table(surveys)
+    if filters:
+        table = table.filter(pq.filters_to_expression(filters))
+    if columns is not None:
+        table = table.select(columns)
+    return table.to_pandas()
+
+
+class SurveyAnswers:
+    """Survey answers indexed by (respondent, question_id), serving any question as a column.
+
+    A respondent is a session, or with `index=["session_id", "interface_option"]`
+    one post-interface survey of a session. Respondents keep their order of
+    appearance, and the last answer wins if a question was answered twice.
+    Per-respondent columns such as interface_order are kept from their first row.
+    """
+
+    def __init__(self, answers, index="session_id", attributes=()):
+        self.index = [index] if isinstance(index, str) else list(index)
+        first_rows = answers.drop_duplicates(self.index).set_index(self.index)
+        self.respondents = first_rows.index
+        self.attributes = first_rows[list(attributes)]
+        self.answers = (answers.drop(columns=list(attributes))
+                        .drop_duplicates(self.index + ["question_id"], keep="last")
+                        .set_index(self.index + ["question_id"])
+                        .sort_index())
+
+    @classmethod
+    def load(cls, filters=None, values=("answer_text",), attributes=(), index="session_id", name="survey_answers"):
+        """Index the `values` (and respondent `attributes`) columns of the answers matching `filters`."""
+        index = [index] if isinstance(index, str) else list(index)
+        columns = index + ["question_id"] + list(values) + list(attributes)
+        return cls(load_survey_answers(name, columns=columns, filters=filters), index, attributes)
+
+    def question(self, question_id, values="answer_text"):
+        """The answer of every respondent to one question (missing where unanswered)."""
+        try:
+            answers = self.answers[values].xs(question_id, level="question_id")
+        except KeyError:
+            answers = pd.Series(index=self.respondents, dtype=self.answers[values].dtype)
+        return answers.reindex(self.respondents).rename(question_id)
+
+    def questions(self, question_ids, values="answer_text"):
+        """One column per question, one row per respondent."""
+        return pd.concat([self.question(question_id, values) for question_id in question_ids], axis=1)
+
+    def attribute(self, column):
+        """A per-respondent column, e.g. interface_order."""
+        return self.attributes[column]
+
+
+def feature_masks(features, dictionary=None):
+    """Encode a column of feature lists as uint64 bitmasks, bit i set for `dictionary[i]`.
+
+    The dictionary defaults to the sorted features that occur in the column.
+    Returns (dictionary, masks) with one mask per row (0 for rows without features)."""
+    exploded = pd.Series(features.to_numpy(), dtype=object).explode().dropna()
+    if dictionary is None:
+        dictionary = sorted(exploded.unique())
+    if len(dictionary) > 64:
+        raise ValueError(f"{len(dictionary)} features do not fit in a 64-bit mask")
+
+    codes = pd.Categorical(exploded, categories=dictionary).codes
+    known = codes >= 0
+    masks = np.zeros(len(features), dtype=np.uint64)
+    bits = np.left_shift(np.uint64(1), codes[known].astype(np.uint64))
+    np.bitwise_or.at(masks, exploded.index.to_numpy()[known], bits)
+    return list(dictionary), masks
+
+
+def has_features(masks, dictionary, *names):
+    """Boolean array: which masks have all of the named features (unknown names match nothing)."""
+    if any(name not in dictionary for name in names):
+        return np.zeros(len(masks), dtype=bool)
+    wanted = np.uint64(sum(1 << dictionary.index(name) for name in names))
+    return (masks & wanted) == wanted
+
+
+def event_rows(session_id, step_id, step_content):
+    """Yield one EVENT_SCHEMA row per event of a step."""
+    for event_index, event in enumerate(step_content.get("events", [])):
+        details = event.get("details", {})
+        accommodation = details.get("accommodation")
+        go_to = details.get("goTo")
+        yield {
+            "session_id": session_id,
+            "step_id": step_id,
+            "interface_option": step_content.get("interfaceOption"),
+            "task_type": step_content.get("taskType"),
+            "event_index": event_index,
+            "type": event.get("type"),
+            "timestamp": event.get("timestamp"),
+            "target_type": details.get("targetType"),
+            "to": details.get("to"),
+            "go_to": go_to if isinstance(go_to, bool) else None,
+            "accommodation_id": accommodation.get("id") if isinstance(accommodation, dict) else None,
+        }
+
+
+def read_table_metadata(path):
+    """Return the key/value metadata stored in a Parquet file's schema."""
+    metadata = pq.read_schema(path).metadata or {}
+    return {key.decode(): value.decode() for key, value in metadata.items()}
+
+
+def drop_event_sessions(path, session_ids):
+    """Rewrite an event table part without the events of `session_ids`.
+
+    The export hash is removed from its metadata, so a cached extraction
+    writes the part in full again instead of serving the filtered one.
+    """
+    table = pq.read_table(path)
+    metadata = {key: value for key, value in read_table_metadata(path).items() if key != "export_hash"}
+    superseded = pc.is_in(table["session_id"], value_set=pa.array(sorted(session_ids), pa.string()))
+    table = table.filter(pc.invert(superseded))
+    pq.write_table(table.replace_schema_metadata(metadata or None), path)
+
+
+class EventTableWriter:
+    """Append task events to a Parquet file in row groups of `batch_size` events.
+
+    Used as a context manager, the file is removed if the block raises.
+    """
+
+    def __init__(self, path, batch_size=100_000, metadata=None):
+        self.path = path
+        self.batch_size = batch_size
+        self.schema = EVENT_SCHEMA.with_metadata(metadata) if metadata else EVENT_SCHEMA
+        self._writer = None
+        self._columns = {name: [] for name in EVENT_SCHEMA.names}
+
+    def write_step(self, session_id, step_id, step_content):
+        for row in event_rows(session_id, step_id, step_content):
+            for name, value in row.items():
+                self._columns[name].append(value)
+
+        if len(self._columns["session_id"]) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.path, self.schema)
+        if self._columns["session_id"]:
+            self._writer.write_table(pa.Table.from_pydict(self._columns, schema=self.schema))
+            self._columns = {name: [] for name in EVENT_SCHEMA.names}
+
+    def close(self):
+        self.flush()
+        self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+            return
+        # A failed extraction must not leave a truncated part that reads back as valid
+        if self._writer is not None:
+            self._writer.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
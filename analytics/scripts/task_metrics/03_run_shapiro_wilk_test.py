@@ -1,6 +1,12 @@
+import os
+import sys
+
 import pandas as pd
 from scipy.stats import shapiro
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from stats_utils import MetricCube
+
 # Load the cleaned data
 task_metrics_clean = pd.read_csv("task_metrics_clean.csv")
 
@@ -16,12 +22,15 @@ metrics = [
     "total_scrolls"
 ]
 
-def run_shapiro_tests(df: pd.DataFrame, label: str):
+# Split the rows once by task type, interface and metric
+cube = MetricCube(task_metrics_clean, metrics, interfaces)
+
+def run_shapiro_tests(cube: MetricCube, label: str):
     results = []
 
     for metric in metrics:
         for interface in interfaces:
-            data = df.query(f"interface_option == '{interface}'")[metric]
+            data = cube.sample(label, metric, interface)
 
             if len(data) < 3:
                 result = {
@@ -47,13 +56,13 @@ def run_shapiro_tests(df: pd.DataFrame, label: str):
     return pd.DataFrame(results)
 
 # Run and save tests
-df_all = run_shapiro_tests(task_metrics_clean, "all")
+df_all = run_shapiro_tests(cube, "all")
 df_all.to_csv("shapiro_all_tasks.csv", index=False)
 
-df_exploratory = run_shapiro_tests(task_metrics_clean[task_metrics_clean["task_type"] == "exploratory"], "exploratory")
+df_exploratory = run_shapiro_tests(cube, "exploratory")
 df_exploratory.to_csv("shapiro_exploratory_tasks.csv", index=False)
 
-df_goal = run_shapiro_tests(task_metrics_clean[task_metrics_clean["task_type"] == "goal"], "goal")
+df_goal = run_shapiro_tests(cube, "goal")
 df_goal.to_csv("shapiro_goal_tasks.csv", index=False)
 
 print("Saved Shapiro-Wilk test results for all, exploratory and goal-oriented tasks.")
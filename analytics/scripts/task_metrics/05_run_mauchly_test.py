@@ -1,8 +1,12 @@
 import os
+import sys
 
 import pandas as pd
 import pingouin as pg
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from stats_utils import MetricCube, task_type_slices
+
 # Load cleaned data
 df = pd.read_csv("task_metrics_clean_full_participants.csv")
 
@@ -16,21 +20,20 @@ metrics = [
     "total_hovers",
     "total_scrolls"
 ]
+interfaces = ["benchmark", "single", "multi"]
+
+# Per-participant averages of every task-type slice, computed once
+cube = MetricCube(df, metrics, interfaces, slices=task_type_slices(df, all_label="all_tasks"))
 
 # Define output directory
 os.makedirs("mauchly", exist_ok=True)
 
 # Run Mauchly’s Test on each metric
-def run_mauchly_tests(df, label):
+def run_mauchly_tests(cube, label):
     records = []
 
     for metric in metrics:
-        wide = df.pivot_table(
-            index='session_id',
-            columns='interface_option',
-            values=metric,
-            aggfunc='mean'
-        ).dropna()
+        wide = cube.wide(label, metric)
 
         if wide.shape[1] < 2:
             records.append({
@@ -78,6 +81,5 @@ def run_mauchly_tests(df, label):
 
 
 # Run for all, exploratory, and goal
-run_mauchly_tests(df, "all_tasks")
-run_mauchly_tests(df[df["task_type"] == "exploratory"], "exploratory")
-run_mauchly_tests(df[df["task_type"] == "goal"], "goal")
+for label in cube.slices:
+    run_mauchly_tests(cube, label)
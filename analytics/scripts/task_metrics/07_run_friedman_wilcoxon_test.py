@@ -1,12 +1,12 @@
-import itertools
+import argparse
 import os
+import sys
 
 import pandas as pd
-from scipy.stats import friedmanchisquare, wilcoxon
-from statsmodels.stats.multitest import multipletests
 
-# Load cleaned data
-df = pd.read_csv("task_metrics_clean_full_participants.csv")
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from resampling_utils import paired_effect_sizes
+from stats_utils import MetricCube, friedman_wilcoxon, task_type_slices
 
 # Configuration
 metrics = [
@@ -21,75 +21,59 @@ metrics = [
 interfaces = ["benchmark", "single", "multi"]
 alpha = 0.05
 output_dir = "friedman_wilcoxon"
-os.makedirs(output_dir, exist_ok=True)
 
-def run_friedman_analysis(df_input, label):
-    results = []
 
-    # Pre-aggregate per participant & interface (goal + exploratory averaged)
-    agg_df = (
-        df_input.groupby(["session_id", "interface_option"])
-        .mean(numeric_only=True)
-        .reset_index()
-    )
+def main():
+    parser = argparse.ArgumentParser(description="Friedman and Wilcoxon tests with resampled effect sizes per task metric.")
+    parser.add_argument("--resamples", type=int, default=10_000,
+                        help="bootstrap resamples per metric and interface pair (default: 10000)")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="seed of the resampling (default: 0)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="number of processes drawing the resamples (default: one per CPU)")
+    args = parser.parse_args()
 
-    for metric in metrics:
-        # Pivot to wide format
-        wide = agg_df.pivot(index="session_id", columns="interface_option", values=metric).dropna()
+    # Load cleaned data
+    df = pd.read_csv("task_metrics_clean_full_participants.csv")
+    os.makedirs(output_dir, exist_ok=True)
 
-        if wide.shape[1] < 3:
-            continue
+    # All metrics and task-type slices are tested in one batch
+    # (goal + exploratory are averaged per participant & interface once, and
+    # the averages are shared by the tests and the effect sizes)
+    cube = MetricCube(df, metrics, interfaces, slices=task_type_slices(df, all_label="all_tasks"))
+    results = friedman_wilcoxon(df, metrics, interfaces, alpha=alpha, cube=cube)
+    results.to_csv(os.path.join(output_dir, "friedman_wilcoxon_results.csv"), index=False)
 
-        # Friedman test
-        stat, p = friedmanchisquare(wide["benchmark"], wide["single"], wide["multi"])
-        base_result = {
-            "metric": metric,
-            "friedman_chi2": stat,
-            "friedman_p": p
-        }
+    # One file per task-type slice
+    for label, label_results in results.groupby("subset", sort=False):
+        rows = []
+        for metric, metric_results in label_results.groupby("metric", sort=False):
+            omnibus = metric_results.iloc[0]
+            base_result = {
+                "metric": metric,
+                "friedman_chi2": omnibus["statistic"],
+                "friedman_p": omnibus["p_uncorrected"]
+            }
+            posthoc = metric_results[metric_results["test"] == "wilcoxon"]
+            if posthoc.empty:
+                rows.append({**base_result, "comparison": None, "wilcoxon_W": None, "p_uncorrected": None,
+                             "p_holm": None, "significant": None, "task_type": label})
+            for _, test in posthoc.iterrows():
+                rows.append({**base_result, "comparison": test["comparison"], "wilcoxon_W": test["statistic"],
+                             "p_uncorrected": test["p_uncorrected"], "p_holm": test["p_holm"],
+                             "significant": test["significant"], "task_type": label})
 
-        # Post-hoc Wilcoxon if significant
-        if p < alpha:
-            pairs = list(itertools.combinations(interfaces, 2))
-            raw_p = []
-            posthoc_results = []
+        out_path = os.path.join(output_dir, f"friedman_wilcoxon_{label}.csv")
+        pd.DataFrame(rows).to_csv(out_path, index=False)
+        print(f"Saved: {out_path}")
 
-            for a, b in pairs:
-                w_stat, p_w = wilcoxon(wide[a], wide[b])
-                raw_p.append(p_w)
-                posthoc_results.append((f"{a} vs {b}", w_stat, p_w))
-
-            # Holm correction
-            reject, p_holm, _, _ = multipletests(raw_p, alpha=alpha, method="holm")
-
-            for i, (pair, w, p_unc) in enumerate(posthoc_results):
-                results.append({
-                    **base_result,
-                    "comparison": pair,
-                    "wilcoxon_W": w,
-                    "p_uncorrected": p_unc,
-                    "p_holm": p_holm[i],
-                    "significant": reject[i],
-                    "task_type": label
-                })
-        else:
-            results.append({
-                **base_result,
-                "comparison": None,
-                "wilcoxon_W": None,
-                "p_uncorrected": None,
-                "p_holm": None,
-                "significant": None,
-                "task_type": label
-            })
-
-    # Save to CSV
-    df_results = pd.DataFrame(results)
-    out_path = os.path.join(output_dir, f"friedman_wilcoxon_{label}.csv")
-    df_results.to_csv(out_path, index=False)
+    # Effect sizes with bootstrap CIs and exact permutation p-values for every interface pair
+    effect_sizes = paired_effect_sizes(df, metrics, interfaces, n_resamples=args.resamples,
+                                       seed=args.seed, workers=args.workers, cube=cube)
+    out_path = os.path.join(output_dir, "effect_sizes.csv")
+    effect_sizes.to_csv(out_path, index=False)
     print(f"Saved: {out_path}")
 
-# Run analyses
-run_friedman_analysis(df, "all_tasks")
-run_friedman_analysis(df[df["task_type"] == "exploratory"], "exploratory")
-run_friedman_analysis(df[df["task_type"] == "goal"], "goal")
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,33 @@
-import ast
+import os
+import sys
 
 import matplotlib.pyplot as plt
 import numpy as np
-import pandas as pd
 
-# 1. Load cleaned task metrics
-task_metrics_clean = pd.read_csv("task_metrics_clean.csv")
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from table_utils import feature_masks, has_features, load_task_table
 
-# 2. Parse the selected accommodation JSON strings
-task_metrics_clean['selected_accommodation'] = task_metrics_clean['selected_accommodation'].apply(ast.literal_eval)
+# 1. Load only the columns needed from the cleaned task table
+task_metrics_clean = load_task_table(
+    "task_metrics_clean",
+    columns=["interface_option", "task_type", "selected_price", "selected_distance", "selected_features"]
+)
 
-# 3. Filter to goal-oriented tasks only
+# 2. Filter to goal-oriented tasks only
 goals = task_metrics_clean[task_metrics_clean['task_type'] == 'goal'].copy()
 
-# 4. Extract numeric fields and success flags
-goals['price']      = goals['selected_accommodation'].apply(lambda a: a['price'])
-goals['distance']   = goals['selected_accommodation'].apply(lambda a: a['distance'])
-goals['has_pool']   = goals['selected_accommodation'].apply(lambda a: 'Swimming pool' in a['features'])
+# 3. Extract numeric fields and success flags
+goals['price']      = goals['selected_price']
+goals['distance']   = goals['selected_distance']
+# Features as bitmasks, so feature filters are bitwise tests over all rows at once
+feature_dictionary, feature_bits = feature_masks(goals['selected_features'])
+goals['has_pool']   = has_features(feature_bits, feature_dictionary, 'Swimming pool')
 
 goals['price_ok']    = goals['price']    <= 100
 goals['distance_ok'] = goals['distance'] <= 2
 goals['pool_ok']     = goals['has_pool']
 
-# 5. Compute success rates (%) per interface
+# 4. Compute success rates (%) per interface
 success_rates = (
     goals
       .groupby('interface_option')[['price_ok','distance_ok','pool_ok']]
@@ -46,7 +51,7 @@ success_rates = (
     .rename(index=interface_labels)
 )
 
-# 6. Plot grouped bar chart
+# 5. Plot grouped bar chart
 metrics     = ['price_ok','distance_ok','pool_ok']
 labels      = ['Price ≤ €100','Distance ≤ 2 km','Has a Swimming Pool']
 interfaces  = success_rates.index.tolist()
@@ -1,17 +1,21 @@
-import ast
+import os
+import sys
 
 import pandas as pd
 from scipy.stats import shapiro
 
-# 1) Load & filter to goal tasks
-df = pd.read_csv("task_metrics_clean.csv")
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from table_utils import load_task_table
+
+# 1) Load the selected accommodation columns & filter to goal tasks
+df = load_task_table(
+    "task_metrics_clean",
+    columns=["interface_option", "task_type", "selected_price", "selected_rating", "selected_distance"]
+)
 df = df[df["task_type"] == "goal"]
 
-# 2) Parse selected accommodation and derive metrics
-df["selected_accommodation"] = df["selected_accommodation"].apply(ast.literal_eval)
-df["price"]    = df["selected_accommodation"].apply(lambda a: a["price"])
-df["rating"]   = df["selected_accommodation"].apply(lambda a: a["rating"])
-df["distance"] = df["selected_accommodation"].apply(lambda a: a["distance"])
+# 2) Derive metrics
+df = df.rename(columns={"selected_price": "price", "selected_rating": "rating", "selected_distance": "distance"})
 df["rating_per_eur"] = df["rating"] / df["price"]
 
 metrics = ["price", "rating", "distance", "rating_per_eur"]
@@ -1,112 +1,103 @@
-import ast
-import itertools
+import argparse
+import os
+import sys
 
-import matplotlib.pyplot as plt
 import pandas as pd
 from pandas.api.types import CategoricalDtype
-from scipy.stats import friedmanchisquare, wilcoxon
-from statsmodels.stats.multitest import multipletests
-
-# 1. Load cleaned task metrics and filter to goal tasks
-df = pd.read_csv("task_metrics_clean_full_participants.csv")
-df = df[df["task_type"] == "goal"].copy()
-
-# 2. Parse the selected_accommodation JSON and extract numeric fields
-df['selected_accommodation'] = df['selected_accommodation'].apply(ast.literal_eval)
-df['price']    = df['selected_accommodation'].apply(lambda a: a['price'])
-df['rating']   = df['selected_accommodation'].apply(lambda a: a['rating'])
-df['distance'] = df['selected_accommodation'].apply(lambda a: a['distance'])
-df['rating_per_euro'] = df['rating'] / df['price']
-
-# 3. Descriptive statistics
-desc = (
-    df.groupby("interface_option")[["price", "rating", "distance", "rating_per_euro"]]
-      .agg(['mean', 'std', 'count'])
-)
-desc.to_csv("goal_outcome_descriptive_stats.csv")
-print("Saved descriptive statistics to 'goal_outcome_descriptive_stats.csv'")
-
-# 4. Aggregate per participant & interface
-outcome_metrics = ["price", "rating", "distance", "rating_per_euro"]
-agg = (
-    df
-    .groupby(["session_id", "interface_option"])[outcome_metrics]
-    .mean()
-    .reset_index()
-)
-
-# 5. Friedman + post-hoc Wilcoxon
-alpha = 0.05
-interfaces = ["benchmark", "single", "multi"]
-results = []
-
-for metric in outcome_metrics:
-    wide = agg.pivot(index="session_id", columns="interface_option", values=metric).dropna()
-    chi2, p = friedmanchisquare(wide["benchmark"], wide["single"], wide["multi"])
-
-    results.append({
-        "metric": metric,
-        "comparison": "Friedman omnibus",
-        "chi2": chi2,
-        "W": None,
-        "p_uncorrected": p,
-        "p_holm": None,
-        "significant": p < alpha
-    })
-
-    if p < alpha:
-        raw_ps = []
-        comparisons = []
-        for a, b in itertools.combinations(interfaces, 2):
-            W, p_unc = wilcoxon(wide[a], wide[b])
-            raw_ps.append(p_unc)
-            comparisons.append((f"{a} vs {b}", W, p_unc))
-
-        reject, p_holm, _, _ = multipletests(raw_ps, alpha=alpha, method='holm')
-        for (pair, W, p_unc), ph, sig in zip(comparisons, p_holm, reject):
-            results.append({
-                "metric": metric,
-                "comparison": pair,
-                "chi2": None,
-                "W": W,
-                "p_uncorrected": p_unc,
-                "p_holm": ph,
-                "significant": sig
-            })
-
-# Save results to CSV
-results_df = pd.DataFrame(results)
-results_df.to_csv("friedman_wilcoxon_goal_outcome.csv", index=False)
-print("Saved test results to 'friedman_wilcoxon_goal_outcome.csv'")
-
-# 6. Define label mapping
-label_map = {
-    "benchmark": "List",
-    "single": "Single-directional",
-    "multi": "Multi-directional"
-}
-
-# Replace interface labels in the DataFrame
-df["interface_label"] = df["interface_option"].map(label_map)
-
-# Define categorical order
-interface_order = ["List", "Single-directional", "Multi-directional"]
-cat_type = CategoricalDtype(categories=interface_order, ordered=True)
-df["interface_label"] = df["interface_label"].astype(cat_type)
-
-# 7. Boxplots (1×2 grid)
-fig, axes = plt.subplots(1, 2, figsize=(10, 8))
-axes = axes.flatten()
-for ax, metric in zip(axes, ["rating_per_euro","distance"]):
-    df.boxplot(column=metric, by='interface_label', ax=ax)
-    ax.set_title(metric.replace('_', ' ').title())
-    ax.set_xlabel('')
-    ax.set_ylabel(metric.replace('_', ' ').title())
-
-plt.suptitle('Outcome Quality Distributions by Interface (Goal Tasks)')
-plt.tight_layout(rect=[0, 0.03, 1, 0.95])
-
-# Save boxplots image
-plt.savefig("goal_outcome_boxplots.png", dpi=300)
-print("Saved boxplots to 'goal_outcome_boxplots.png'")
-plt.close()
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from plot_utils import Figure, boxplot_grid, render_figures
+from resampling_utils import paired_effect_sizes
+from stats_utils import friedman_wilcoxon
+from table_utils import load_task_table
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the outcome quality of goal tasks between interfaces.")
+    parser.add_argument("--resamples", type=int, default=10_000,
+                        help="bootstrap resamples per metric and interface pair (default: 10000)")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="seed of the resampling (default: 0)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="number of processes drawing the resamples (default: one per CPU)")
+    parser.add_argument("--force", action="store_true",
+                        help="render the boxplots even if their inputs are unchanged")
+    args = parser.parse_args()
+
+    # 1. Load the selected accommodation columns and filter to goal tasks
+    df = load_task_table(
+        "task_metrics_clean_full_participants",
+        columns=["session_id", "interface_option", "task_type", "selected_price", "selected_rating", "selected_distance"]
+    )
+    df = df[df["task_type"] == "goal"].copy()
+
+    # 2. Extract numeric fields
+    df = df.rename(columns={"selected_price": "price", "selected_rating": "rating", "selected_distance": "distance"})
+    df['rating_per_euro'] = df['rating'] / df['price']
+
+    # 3. Descriptive statistics
+    desc = (
+        df.groupby("interface_option")[["price", "rating", "distance", "rating_per_euro"]]
+          .agg(['mean', 'std', 'count'])
+    )
+    desc.to_csv("goal_outcome_descriptive_stats.csv")
+    print("Saved descriptive statistics to 'goal_outcome_descriptive_stats.csv'")
+
+    # 4. Friedman + post-hoc Wilcoxon (averaged per participant & interface)
+    outcome_metrics = ["price", "rating", "distance", "rating_per_euro"]
+    alpha = 0.05
+    interfaces = ["benchmark", "single", "multi"]
+    tests = friedman_wilcoxon(df, outcome_metrics, interfaces, alpha=alpha)
+
+    results = []
+    for _, test in tests.iterrows():
+        omnibus = test["test"] == "friedman"
+        results.append({
+            "metric": test["metric"],
+            "comparison": "Friedman omnibus" if omnibus else test["comparison"],
+            "chi2": test["statistic"] if omnibus else None,
+            "W": None if omnibus else test["statistic"],
+            "p_uncorrected": test["p_uncorrected"],
+            "p_holm": None if omnibus else test["p_holm"],
+            "significant": test["significant"]
+        })
+
+    # Save results to CSV
+    results_df = pd.DataFrame(results)
+    results_df.to_csv("friedman_wilcoxon_goal_outcome.csv", index=False)
+    print("Saved test results to 'friedman_wilcoxon_goal_outcome.csv'")
+
+    # 5. Effect sizes with bootstrap CIs and exact permutation p-values per interface pair
+    effect_sizes = paired_effect_sizes(df, outcome_metrics, interfaces, n_resamples=args.resamples,
+                                       seed=args.seed, workers=args.workers)
+    effect_sizes.to_csv("goal_outcome_effect_sizes.csv", index=False)
+    print("Saved effect sizes to 'goal_outcome_effect_sizes.csv'")
+
+    # 6. Define label mapping
+    label_map = {
+        "benchmark": "List",
+        "single": "Single-directional",
+        "multi": "Multi-directional"
+    }
+
+    # Replace interface labels in the DataFrame
+    df["interface_label"] = df["interface_option"].map(label_map)
+
+    # Define categorical order
+    interface_order = ["List", "Single-directional", "Multi-directional"]
+    cat_type = CategoricalDtype(categories=interface_order, ordered=True)
+    df["interface_label"] = df["interface_label"].astype(cat_type)
+
+    # 7. Boxplots (1×2 grid), skipped if their data is unchanged
+    boxplot_metrics = ["rating_per_euro", "distance"]
+    render_figures([Figure(
+        "goal_outcome_boxplots.png", boxplot_grid, df[["interface_label", *boxplot_metrics]],
+        {"metrics": boxplot_metrics, "by": "interface_label",
+         "title": "Outcome Quality Distributions by Interface (Goal Tasks)"},
+        {"dpi": 300},
+    )], workers=1, force=args.force)
+    print("Saved boxplots to 'goal_outcome_boxplots.png'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from pool_utils import resolve_workers
+from stats_utils import MetricCube, normality_diagnostics, task_type_slices
+from table_utils import load_task_table
+
+interfaces = ["benchmark", "single", "multi"]
+metrics = [
+    "task_completion_time_sec",
+    "total_interactions",
+    "total_navigations",
+    "total_filters",
+    "total_resets",
+    "total_hovers",
+    "total_scrolls"
+]
+outcome_metrics = ["price", "rating", "distance", "rating_per_eur"]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run the Shapiro-Wilk, skewness, kurtosis and Mauchly tests of every metric, interface and "
+                    "task type in one table.")
+    parser.add_argument("--alpha", type=float, default=0.05,
+                        help="significance level of the 'significant' column (default: 0.05)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="number of processes running the normality tests (default: one per CPU)")
+    parser.add_argument("--output", default="normality_diagnostics.csv",
+                        help="CSV file of the results (default: normality_diagnostics.csv)")
+    args = parser.parse_args()
+
+    # 1. Task metrics of all, exploratory and goal tasks (as 03, 04 and 05)
+    tasks = load_task_table("task_metrics_clean", columns=["session_id", "interface_option", "task_type", *metrics])
+    full = load_task_table("task_metrics_clean_full_participants",
+                           columns=["session_id", "interface_option", "task_type", *metrics])
+
+    # 2. Selected accommodation of the goal tasks (as 09)
+    goal = load_task_table(
+        "task_metrics_clean",
+        columns=["session_id", "interface_option", "task_type", "selected_price", "selected_rating",
+                 "selected_distance"]
+    )
+    goal = goal[goal["task_type"] == "goal"]
+    goal = goal.rename(columns={"selected_price": "price", "selected_rating": "rating", "selected_distance": "distance"})
+    goal["rating_per_eur"] = goal["rating"] / goal["price"]
+
+    cubes = {
+        "task_metrics_clean": MetricCube(tasks, metrics, interfaces),
+        "task_metrics_clean_full_participants": MetricCube(full, metrics, interfaces,
+                                                           slices=task_type_slices(full, all_label="all_tasks")),
+        "goal_outcome": MetricCube(goal, outcome_metrics, interfaces,
+                                   slices=task_type_slices(goal, all_label="goal", task_types=())),
+    }
+
+    # 3. Every cell of every dataset in one batched run
+    results = normality_diagnostics(cubes, workers=resolve_workers(args.workers), alpha=args.alpha)
+    results.to_csv(args.output, index=False)
+
+    flagged = results[results["significant"]]
+    print(f"Saved {len(results)} tests to '{args.output}' ({len(flagged)} with p < {args.alpha}).")
+
+
+if __name__ == "__main__":
+    main()
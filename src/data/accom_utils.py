@@ -1,8 +1,7 @@
 import os
 import random
 
-from geopy.distance import distance as geopy_distance
-from geopy.point import Point
+from geo_utils import destination_points
 
 # Accommodation types and corresponding price ranges
 price_ranges = {
@@ -151,110 +150,122 @@ names_part_2_by_type = {
 valencia_center = (39.4699, -0.3763)
 
 # Generate a skewed rating
-def generate_rating_by_type(accommodation_type: str) -> float:
+def generate_rating_by_type(accommodation_type: str, rng=random) -> float:
     low, high = rating_ranges.get(accommodation_type, (3.0, 4.5))
     # Bias towards higher values in range
-    return round(random.triangular(low, high, high), 2)
+    return round(rng.triangular(low, high, high), 2)
     
 # Generate a skewed distance: most close, some medium, few far    
-def generate_skewed_distance():
-    random_value = random.random()
+def generate_skewed_distance(rng=random):
+    random_value = rng.random()
     if random_value < 0.4:
         # Central (0.0–1.0 km): 40%
-        return round(random.uniform(0.0, 1.0), 2)
+        return round(rng.uniform(0.0, 1.0), 2)
     elif random_value < 0.6:
         # Walkable (1.5–3.5 km): 20%
-        return round(random.uniform(1.0, 1.5), 1)
+        return round(rng.uniform(1.0, 1.5), 1)
     elif random_value < 0.85:
         # Walkable but farther (1.5–3.5 km): 25%
-        return round(random.uniform(1.5, 3.5), 1)
+        return round(rng.uniform(1.5, 3.5), 1)
     elif random_value < 0.97:
         # Commutable (3.5–6.0 km): 12%
-        return round(random.uniform(3.5, 6.0), 1)
+        return round(rng.uniform(3.5, 6.0), 1)
     else:
         # Far suburbs or remote (6.0–10.0 km): 3%
-        return round(random.uniform(6.0, 10.0), 1)
+        return round(rng.uniform(6.0, 10.0), 1)
     
-def random_location_at_distance(dist_km):
-    bearing = random.uniform(0, 360)  # Random direction in degrees
-    origin = Point(valencia_center[0], valencia_center[1])
-    destination = geopy_distance(kilometers=dist_km).destination(origin, bearing)
-    return {"lat": round(destination.latitude, 6), "lng": round(destination.longitude, 6)}
+def random_location_at_distance(dist_km, rng=random):
+    bearing = rng.uniform(0, 360)  # Random direction in degrees
+    lat, lng = destination_points(valencia_center, dist_km, bearing)
+    return {"lat": round(float(lat), 6), "lng": round(float(lng), 6)}
 
 # Helper to pick appropriate features based on type
-def generate_features(accommodation_type):
+def generate_features(accommodation_type, rng=random):
     features = features_by_type[accommodation_type]
     dynamic_features = dynamic_features_by_type[accommodation_type]
 
     # Determine the number of dynamic features to pick
     max_dynamic_count = len(dynamic_features)
     min_dynamic_count = max(0, max_dynamic_count - 6)
-    dynamic_count = random.randint(min_dynamic_count, max_dynamic_count)
+    dynamic_count = rng.randint(min_dynamic_count, max_dynamic_count)
 
     # Randomly select the determined number of dynamic features
-    selected_dynamic_features = random.sample(dynamic_features, dynamic_count)
+    selected_dynamic_features = rng.sample(dynamic_features, dynamic_count)
 
-    # Combine static and dynamic features
-    combined_features = list(set(features + selected_dynamic_features))
+    # Combine static and dynamic features (in a fixed order, so seeded runs are reproducible)
+    combined_features = list(dict.fromkeys(features + selected_dynamic_features))
 
     return combined_features
 
 # Helper to generate accommodation name
-def generate_accommodation_name(accommodation_type):
+def generate_accommodation_name(accommodation_type, rng=random):
     part1_options = names_part_1_by_type[accommodation_type]
     part2_options = names_part_2_by_type[accommodation_type]
-    part1 = random.choice(part1_options)
-    part2 = random.choice(part2_options)
+    part1 = rng.choice(part1_options)
+    part2 = rng.choice(part2_options)
     return f"{part1} {part2}"
 
-# Helper to pick appropriate images based on type
-def generate_images(accom_type, features):
-    # Accommodation type mappings
-    type_mapping = {
-        "Hostel (Dormitory Bed)": "hostel_dormitory_bed",
-        "Hostel (Private Room)": "hostel_private_room",
-        "Budget Hotel": "budget_hotel",
-        "Guesthouse / Bed & Breakfast (B&B)": "guesthouse_bnb",
-        "Mid-Range Hotel": "midrange_hotel",
-        "Upper Mid-Range Hotel": "upper_midrange_hotel",
-        "Luxury Hotel": "luxury_hotel",
-        "Entire Apartment / House": "entire_apartment_house"
-    }
+# Image folders per accommodation type
+image_folders_by_type = {
+    "Hostel (Dormitory Bed)": "hostel_dormitory_bed",
+    "Hostel (Private Room)": "hostel_private_room",
+    "Budget Hotel": "budget_hotel",
+    "Guesthouse / Bed & Breakfast (B&B)": "guesthouse_bnb",
+    "Mid-Range Hotel": "midrange_hotel",
+    "Upper Mid-Range Hotel": "upper_midrange_hotel",
+    "Luxury Hotel": "luxury_hotel",
+    "Entire Apartment / House": "entire_apartment_house"
+}
+
+# Image folders of the features that come with an extra image
+image_folders_by_feature = {
+    "Gym": "gym",
+    "Swimming pool": "pool",
+    "Rooftop terrace": "rooftop_terrace",
+    "Sauna": "sauna",
+    "Sea view": "sea_view",
+}
 
-    # Feature mapping for images
-    feature_mapping = {
-        "Gym": "gym",
-        "Swimming pool": "pool",
-        "Rooftop terrace": "rooftop_terrace",
-        "Sauna": "sauna",
-        "Sea view": "sea_view",
-    }
+# Accommodation image categories
+def image_categories(accom_type):
+    if accom_type == "Entire Apartment / House":
+        return ["balcony", "bathroom", "kitchen", "living_room", "room"]
+    return ["room", "bathroom", "reception"]
 
+# Helper to pick appropriate images based on type
+def generate_images(accom_type, features, rng=random):
     # Determine folder paths based on accommodation type
     base_path = "/images/"
-    accom_folder = type_mapping.get(accom_type, "generic")
+    accom_folder = image_folders_by_type.get(accom_type, "generic")
 
     # Accommodation image categories
-    if accom_type == "Entire Apartment / House":
-        categories = ["balcony", "bathroom", "kitchen", "living_room", "room"]
-    else:
-        categories = ["room", "bathroom", "reception"]
+    categories = image_categories(accom_type)
 
     # Gather accommodation images
     image_paths = []
     for category in categories:
-        image_number = random.randint(1, 10)  # Randomly pick a number from 1 to 10
+        image_number = rng.randint(1, 10)  # Randomly pick a number from 1 to 10
         image_file = f"{category}{image_number}.jpg"
         image_path = f"{base_path}{accom_folder}/{category}/{image_file}"
         image_paths.append(image_path)
 
     # Gather feature images
     for feature in features:
-        if feature in feature_mapping:
-            folder_name = feature_mapping[feature]
-            image_number = random.randint(1, 5)  # Randomly pick from 5 feature images
+        if feature in image_folders_by_feature:
+            folder_name = image_folders_by_feature[feature]
+            image_number = rng.randint(1, 5)  # Randomly pick from 5 feature images
             image_file = f"{folder_name}{image_number}.jpg"
             image_path = os.path.join(base_path, "features", folder_name, image_file)
             image_paths.append(image_path)
 
     return image_paths
+
+# Helper to list every image path generate_images can produce, in a fixed order
+def all_image_paths():
+    image_paths = []
+    for accom_type, accom_folder in image_folders_by_type.items():
+        for category in image_categories(accom_type):
+            image_paths += [f"/images/{accom_folder}/{category}/{category}{n}.jpg" for n in range(1, 11)]
+    for folder_name in image_folders_by_feature.values():
+        image_paths += [f"/images/features/{folder_name}/{folder_name}{n}.jpg" for n in range(1, 6)]
+    return image_paths
@@ -0,0 +1,231 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from accom_utils import (generate_accommodation_name, generate_features,
+                         generate_images, generate_skewed_distance,
+                         price_ranges, random_location_at_distance)
+from bulk_utils import generate_bulk, iter_records
+from coverage_utils import coverage_records
+from generate_accommodation_dataset import (BULK_CHUNK_SIZE, COVERAGE_STRENGTH,
+                                            build_random_accommodation,
+                                            coverage_axes, python_rng,
+                                            seed_stream)
+from writer_utils import FORMATS, write_dataset
+
+# Dataset sizes benchmarked by default
+SIZES = [250, 10_000, 100_000, 1_000_000]
+
+# Records per size the per-helper stages are timed on (they scale linearly)
+HELPER_SAMPLE = 100_000
+
+# Runs per case; the fastest one is reported, as the least disturbed by other load
+REPEATS = 3
+
+# Cases faster than this (in the results or the baseline) are too noisy for the regression check
+MIN_COMPARE_SECONDS = 1.0
+
+# Helper to sum the time spent producing the items of an iterator under `stages[stage]`
+def timed(iterable, stages, stage):
+    iterator = iter(iterable)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            stages[stage] += time.perf_counter() - start
+            return
+        stages[stage] += time.perf_counter() - start
+        yield item
+
+# Helper to read the peak resident set size of this process in MB
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes elsewhere
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+def random_records(count, start_id, mode, seed, stages):
+    """The random part of the dataset, with generation time split by stage in `stages`."""
+    if mode == "loop":
+        rng = python_rng(seed_stream(seed, 1))
+        yield from timed((build_random_accommodation(i, rng) for i in range(start_id, start_id + count)),
+                         stages, "random_fill")
+        return
+
+    rng = np.random.default_rng(seed_stream(seed, 1))
+    next_id, stop = start_id, start_id + count
+    while next_id < stop:
+        size = min(BULK_CHUNK_SIZE, stop - next_id)
+        start = time.perf_counter()
+        columns = generate_bulk(size, start_id=next_id, rng=rng)
+        stages["bulk_draw"] += time.perf_counter() - start
+        yield from timed(iter_records(columns), stages, "bulk_records")
+        next_id += size
+
+def time_helpers(count, seed):
+    """Seconds the per-record helpers of build_random_accommodation take for `count` records."""
+    rng = python_rng(seed_stream(seed, 2))
+    types = [rng.choice(list(price_ranges)) for _ in range(count)]
+    distances = [generate_skewed_distance(rng) for _ in range(count)]
+    stages = {}
+
+    start = time.perf_counter()
+    features = [generate_features(t, rng) for t in types]
+    stages["features"] = time.perf_counter() - start
+
+    # Names, images and locations are drawn once per interface variant
+    start = time.perf_counter()
+    for t in types:
+        for _ in range(3):
+            generate_accommodation_name(t, rng)
+    stages["names"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for t, f in zip(types, features):
+        for _ in range(3):
+            generate_images(t, f, rng)
+    stages["images"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for d in distances:
+        for _ in range(3):
+            random_location_at_distance(d, rng)
+    stages["locations"] = time.perf_counter() - start
+    return stages
+
+def run_case(task):
+    """Generate and serialize one dataset; runs in a fresh process so peak RSS is its own."""
+    count, mode, fmt, seed, helper_sample, tmp_dir = task
+    stages = {"coverage": 0.0, "random_fill": 0.0, "bulk_draw": 0.0, "bulk_records": 0.0}
+    started = time.perf_counter()
+
+    start = time.perf_counter()
+    coverage, _ = coverage_records(coverage_axes, COVERAGE_STRENGTH, count=count, rng=python_rng(seed_stream(seed, 0)))
+    stages["coverage"] = time.perf_counter() - start
+
+    def records():
+        yield from coverage
+        yield from random_records(count - len(coverage), len(coverage) + 1, mode, seed, stages)
+
+    fd, path = tempfile.mkstemp(suffix=FORMATS[fmt], dir=tmp_dir)
+    os.close(fd)
+    try:
+        start = time.perf_counter()
+        write_dataset(records(), path, fmt)
+        # Writing pulls the records from the generators, whose time is already counted above
+        generation = stages["random_fill"] + stages["bulk_draw"] + stages["bulk_records"]
+        stages["serialization"] = time.perf_counter() - start - generation
+        size = os.path.getsize(path)
+    finally:
+        os.remove(path)
+    total = time.perf_counter() - started
+    # Read before the helpers are timed, whose samples are not part of the dataset
+    peak_rss = peak_rss_mb()
+
+    if mode == "loop":
+        sample = min(count, helper_sample)
+        stages.update({name: seconds * count / sample for name, seconds in time_helpers(sample, seed).items()})
+    stages = {name: seconds for name, seconds in stages.items() if seconds}
+
+    return {
+        "records": count,
+        "mode": mode,
+        "format": fmt,
+        "seconds": total,
+        "records_per_sec": count / total,
+        "peak_rss_mb": peak_rss,
+        "bytes_per_record": size / count,
+        "stages": {name: {"seconds": seconds, "records_per_sec": count / seconds} for name, seconds in stages.items()},
+    }
+
+def best_of(task, repeats):
+    """Run a case `repeats` times, each in a fresh process, and return the fastest run."""
+    spawn = multiprocessing.get_context("spawn")
+    runs = []
+    for _ in range(repeats):
+        with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as pool:
+            runs.append(pool.submit(run_case, task).result())
+    return {**min(runs, key=lambda case: case["seconds"]), "repeats": repeats}
+
+def compare(results, baseline, tolerance, min_seconds=MIN_COMPARE_SECONDS):
+    """Print the throughput change against a previous results file; True if nothing regressed.
+
+    Cases that take less than `min_seconds` in either file are reported but
+    never count as a regression, since their timing is mostly noise.
+    """
+    previous = {(c["records"], c["mode"], c["format"]): c for c in baseline["cases"]}
+    ok = True
+    for case in results["cases"]:
+        before = previous.get((case["records"], case["mode"], case["format"]))
+        if before is None:
+            continue
+        if min(case["seconds"], before["seconds"]) < min_seconds:
+            print(f"{case['records']:>9} {case['mode']:<5} {case['format']:<7} skipped (under {min_seconds:g}s)")
+            continue
+        change = case["records_per_sec"] / before["records_per_sec"] - 1
+        regressed = change < -tolerance
+        ok = ok and not regressed
+        print(f"{case['records']:>9} {case['mode']:<5} {case['format']:<7} {change:+.1%}"
+              f"{'  REGRESSION' if regressed else ''}")
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the accommodation dataset generator.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES,
+                        help=f"dataset sizes to benchmark (default: {' '.join(map(str, SIZES))})")
+    parser.add_argument("--modes", nargs="+", choices=["loop", "bulk"], default=["loop", "bulk"],
+                        help="per-record generation, --bulk generation or both (default: both)")
+    parser.add_argument("--format", choices=list(FORMATS), default="json",
+                        help="serialization format (default: json)")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="seed of the generated datasets (default: 0)")
+    parser.add_argument("--helper-sample", type=int, default=HELPER_SAMPLE,
+                        help=f"records the per-helper stages are timed on and scaled from (default: {HELPER_SAMPLE})")
+    parser.add_argument("--repeats", type=int, default=REPEATS,
+                        help=f"runs per case, the fastest is reported (default: {REPEATS})")
+    parser.add_argument("--baseline", default=None,
+                        help="previous results file: print the throughput change and exit 1 on a regression")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="throughput drop against --baseline counted as a regression (default: 0.2)")
+    parser.add_argument("--output", default="benchmark_results.json",
+                        help="results file (default: benchmark_results.json)")
+    args = parser.parse_args()
+    if args.repeats < 1:
+        parser.error("--repeats must be at least 1")
+
+    results = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "cases": [],
+    }
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for mode in args.modes:
+            for count in args.sizes:
+                case = best_of((count, mode, args.format, args.seed, args.helper_sample, tmp_dir), args.repeats)
+                results["cases"].append(case)
+                stages = ", ".join(f"{name} {s['seconds']:.2f}s" for name, s in case["stages"].items())
+                print(f"{count:>9} {mode:<5} {case['records_per_sec']:>10,.0f} rec/s  {case['peak_rss_mb']:>7.1f} MB  "
+                      f"{case['bytes_per_record']:>6.0f} B/rec  ({stages})")
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Saved: {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if not compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
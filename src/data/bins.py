@@ -23,7 +23,7 @@ distance_bins = [
 
 type_bins = list(price_ranges.keys())
 
-# A lookup for coverage_for_axes('price','rating',…) etc.
+# A lookup for coverage_records(['price','rating',…]) etc.
 axis_bins = {
     'price': price_bins,
     'rating': rating_bins,
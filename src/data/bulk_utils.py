@@ -0,0 +1,158 @@
+import numpy as np
+
+from accom_utils import (dynamic_features_by_type, features_by_type,
+                         image_categories, image_folders_by_feature,
+                         image_folders_by_type, names_part_1_by_type,
+                         names_part_2_by_type, price_ranges, rating_ranges,
+                         valencia_center)
+from geo_utils import destination_points
+
+# Accommodation types in the order of price_ranges; records store their index
+TYPES = list(price_ranges.keys())
+
+# Interface variants every record carries its own name, location and images for
+VARIANTS = ["versionBenchmark", "versionSingleAxisCarousel", "versionMultiAxisCarousel"]
+
+# Every feature that any type can have, records store a boolean mask over it
+FEATURES = sorted({f for t in TYPES for f in features_by_type[t] + dynamic_features_by_type[t]})
+
+# Largest number of image categories of a type (see image_categories)
+MAX_CATEGORIES = 5
+
+# (FEATURES column, image folder) of the features that come with an extra image
+IMAGE_FEATURES = [(FEATURES.index(f), folder) for f, folder in image_folders_by_feature.items() if f in FEATURES]
+
+# Segments of generate_skewed_distance: (cumulative probability, low, high, decimals)
+DISTANCE_SEGMENTS = [
+    (0.40, 0.0, 1.0, 2),
+    (0.60, 1.0, 1.5, 1),
+    (0.85, 1.5, 3.5, 1),
+    (0.97, 3.5, 6.0, 1),
+    (1.00, 6.0, 10.0, 1),
+]
+
+
+def draw_ratings(rng, types):
+    # Triangular with mode = high, as generate_rating_by_type (inverse CDF)
+    low, high = np.array([rating_ranges[t] for t in TYPES]).T
+    return np.round(low[types] + (high[types] - low[types]) * np.sqrt(rng.random(len(types))), 2)
+
+
+def draw_distances(rng, count):
+    # Pick a segment of generate_skewed_distance, then a uniform value inside it
+    cumulative, low, high, decimals = (np.array(column) for column in zip(*DISTANCE_SEGMENTS))
+    segment = np.searchsorted(cumulative, rng.random(count), side="right")
+    values = low[segment] + (high[segment] - low[segment]) * rng.random(count)
+    return np.where(decimals[segment] == 2, np.round(values, 2), np.round(values, 1))
+
+
+def draw_features(rng, types):
+    """Boolean (records x FEATURES) mask: the static features of the type plus a random subset
+    of its dynamic features whose size is uniform in [len - 6, len], as generate_features."""
+    mask = np.zeros((len(types), len(FEATURES)), dtype=bool)
+    column = {feature: i for i, feature in enumerate(FEATURES)}
+    for t, accom_type in enumerate(TYPES):
+        rows = np.flatnonzero(types == t)
+        if rows.size == 0:
+            continue
+        dynamic = [column[f] for f in dynamic_features_by_type[accom_type]]
+        counts = rng.integers(max(0, len(dynamic) - 6), len(dynamic) + 1, size=rows.size)
+        # A random order of the dynamic features per record; keep the first `count`
+        order = np.argsort(rng.random((rows.size, len(dynamic))), axis=1)
+        picked = np.zeros((rows.size, len(dynamic)), dtype=bool)
+        np.put_along_axis(picked, order, np.arange(len(dynamic)) < counts[:, None], axis=1)
+        mask[np.ix_(rows, dynamic)] = picked
+        mask[np.ix_(rows, [column[f] for f in features_by_type[accom_type]])] = True
+    return mask
+
+
+def generate_bulk(count, start_id=1, rng=None):
+    """Draw `count` random accommodations at once as NumPy columns.
+
+    Types are uniform; prices, ratings, distances, features, names, image
+    numbers and locations follow the same per-type distributions as
+    build_random_accommodation, but every column is drawn with one array
+    operation instead of per-record `random` calls. Use iter_records to
+    turn the columns into dataset records.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    types = rng.integers(0, len(TYPES), size=count)
+
+    price_low, price_high = np.array([price_ranges[t] for t in TYPES], dtype=float).T
+    prices = np.round(price_low[types] + (price_high[types] - price_low[types]) * rng.random(count), 2)
+    distances = draw_distances(rng, count)
+
+    # Names, image numbers and locations differ per interface variant
+    n_part_1 = np.array([len(names_part_1_by_type[t]) for t in TYPES])
+    n_part_2 = np.array([len(names_part_2_by_type[t]) for t in TYPES])
+    shape = (count, len(VARIANTS))
+    name_part_1 = rng.integers(0, n_part_1[types, None], size=shape, dtype=np.int16)
+    name_part_2 = rng.integers(0, n_part_2[types, None], size=shape, dtype=np.int16)
+    bearings = rng.uniform(0, 360, size=shape)
+    lat, lng = destination_points(valencia_center, distances[:, None], bearings)
+
+    return {
+        "id": np.arange(start_id, start_id + count),
+        "type": types,
+        "price": prices,
+        "rating": draw_ratings(rng, types),
+        "distance": distances,
+        "features": draw_features(rng, types),
+        "name_part_1": name_part_1,
+        "name_part_2": name_part_2,
+        "category_images": rng.integers(1, 11, size=shape + (MAX_CATEGORIES,), dtype=np.int8),
+        "feature_images": rng.integers(1, 6, size=shape + (len(IMAGE_FEATURES),), dtype=np.int8),
+        "lat": np.round(lat, 6),
+        "lng": np.round(lng, 6),
+    }
+
+
+def iter_records(columns):
+    """Yield dataset records (same schema as build_random_accommodation) from generate_bulk columns."""
+    # Every string a record can contain is built once up front
+    names = [[[f"{p1} {p2}" for p2 in names_part_2_by_type[t]] for p1 in names_part_1_by_type[t]] for t in TYPES]
+    category_paths = [
+        [[f"/images/{image_folders_by_type[t]}/{c}/{c}{number}.jpg" for number in range(11)] for c in image_categories(t)]
+        for t in TYPES
+    ]
+    feature_paths = [[f"/images/features/{folder}/{folder}{number}.jpg" for number in range(6)]
+                     for _, folder in IMAGE_FEATURES]
+    image_columns = [f for f, _ in IMAGE_FEATURES]
+
+    # Records share a limited number of feature sets, decoded once per distinct packed mask
+    packed = np.packbits(columns["features"], axis=1)
+    feature_sets = {}
+
+    # Flat Python lists are much faster to index than NumPy arrays (and than nested lists)
+    ids, types = columns["id"].tolist(), columns["type"].tolist()
+    prices, ratings, distances = columns["price"].tolist(), columns["rating"].tolist(), columns["distance"].tolist()
+    lat, lng = columns["lat"].ravel().tolist(), columns["lng"].ravel().tolist()
+    name_part_1, name_part_2 = columns["name_part_1"].ravel().tolist(), columns["name_part_2"].ravel().tolist()
+    category_images = columns["category_images"].ravel().tolist()
+    feature_images = columns["feature_images"].ravel().tolist()
+    n_variants, n_feature_images = len(VARIANTS), len(IMAGE_FEATURES)
+
+    for i, t in enumerate(types):
+        key = packed[i].tobytes()
+        if key not in feature_sets:
+            mask = columns["features"][i]
+            feature_sets[key] = ([FEATURES[f] for f in np.flatnonzero(mask)],
+                                 [k for k, f in enumerate(image_columns) if mask[f]])
+        record_features, image_features = feature_sets[key]
+
+        record = {"id": str(ids[i])}
+        for v, variant in enumerate(VARIANTS):
+            j = i * n_variants + v
+            images = [paths[category_images[j * MAX_CATEGORIES + c]] for c, paths in enumerate(category_paths[t])]
+            images += [feature_paths[k][feature_images[j * n_feature_images + k]] for k in image_features]
+            record[variant] = {
+                "name": names[t][name_part_1[j]][name_part_2[j]],
+                "location": {"lat": lat[j], "lng": lng[j]},
+                "images": images,
+            }
+        record["price"] = prices[i]
+        record["rating"] = ratings[i]
+        record["distance"] = distances[i]
+        record["type"] = TYPES[t]
+        record["features"] = list(record_features)
+        yield record
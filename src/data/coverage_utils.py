@@ -1,5 +1,6 @@
 import random
-from itertools import product
+from itertools import combinations, product
+from math import prod
 
 from accom_utils import (generate_accommodation_name, generate_features,
                          generate_images, generate_rating_by_type,
@@ -8,7 +9,7 @@ from accom_utils import (generate_accommodation_name, generate_features,
 from bins import axis_bins, type_bins
 
 
-def sample_uniform_in(bin_def):
+def sample_uniform_in(bin_def, rng=random):
     """Given {'lowerBound': x, 'upperBound': y} sample a float in [x,y)."""
     lo = bin_def.get('lowerBound', None)
     hi = bin_def.get('upperBound', None)
@@ -17,64 +18,113 @@ def sample_uniform_in(bin_def):
     if hi is None:
         # if no upper bound, just pick something a bit above lo
         hi = lo * 2 or lo + 10
-    return round(random.uniform(lo, hi),2)
+    return round(rng.uniform(lo, hi),2)
 
-def _build_record(rec_id, price, rating, distance, accom_type):
-    features = generate_features(accom_type)
+def _build_record(rec_id, rng=random, **values):
+    """A record with the given price, rating, distance and type; other values
+    (axes added to bins.axis_bins) are written onto the record as they are."""
+    price, rating, distance, accom_type = (values.pop(key) for key in ("price", "rating", "distance", "type"))
+    features = generate_features(accom_type, rng)
 
     return {
       "id": str(rec_id),
       "versionBenchmark": {
-            "name": generate_accommodation_name(accom_type),
-            "location": random_location_at_distance(distance),
-            "images": generate_images(accom_type, features)},
+            "name": generate_accommodation_name(accom_type, rng),
+            "location": random_location_at_distance(distance, rng),
+            "images": generate_images(accom_type, features, rng)},
         "versionSingleAxisCarousel": {
-            "name": generate_accommodation_name(accom_type),
-            "location": random_location_at_distance(distance),
-            "images": generate_images(accom_type, features)},
+            "name": generate_accommodation_name(accom_type, rng),
+            "location": random_location_at_distance(distance, rng),
+            "images": generate_images(accom_type, features, rng)},
         "versionMultiAxisCarousel": {
-            "name": generate_accommodation_name(accom_type),
-            "location": random_location_at_distance(distance),
-            "images": generate_images(accom_type, features)},
+            "name": generate_accommodation_name(accom_type, rng),
+            "location": random_location_at_distance(distance, rng),
+            "images": generate_images(accom_type, features, rng)},
       "price":    round(price, 2),
       "rating":   round(rating, 2),
       "distance": distance,
       "type":     accom_type,
       "features": features,
+      **values,
     }
 
-def coverage_for_axes(axis1: str, axis2: str, start_id: int):
-    """Seed one record for each combination of axis1×axis2 bins."""
-    recs = []
-    next_id = start_id
+def random_axis_values(rng=random):
+    """Random price, rating, distance and type, drawn as for any record."""
+    return {
+        "price": round(rng.uniform(*price_ranges[rng.choice(type_bins)]), 2),
+        "rating": generate_rating_by_type(rng.choice(type_bins), rng),
+        "distance": generate_skewed_distance(rng),
+        "type": rng.choice(type_bins),
+    }
+
+def axis_value_in(bin_def, rng=random):
+    """A value inside a bin of bins.axis_bins: categorical bins (types) are the value itself."""
+    return sample_uniform_in(bin_def, rng) if isinstance(bin_def, dict) else bin_def
+
+def covering_array(levels, strength=2):
+    """Greedy covering array: rows of bin indices, one per axis with `levels[i]` bins,
+    such that every combination of bins of any `strength` axes appears in some row.
 
-    for b1, b2 in product(axis_bins[axis1], axis_bins[axis2]):
-        # pick default random values for all four dims
-        price = round(random.uniform(*price_ranges[random.choice(type_bins)]), 2)
-        rating = generate_rating_by_type(random.choice(type_bins))
-        distance   = generate_skewed_distance()
-        typ    = random.choice(type_bins)
+    Each row starts from the first combination that is still uncovered and fills the
+    other axes (most bins first) with the bin that covers the most new combinations
+    together with the axes already set. Deterministic, and usually close to the
+    lower bound of the product of the `strength` largest levels.
+    """
+    strength = min(strength, len(levels))
+    combos = list(combinations(range(len(levels)), strength))
+    uncovered = {(combo, values) for combo in combos for values in product(*(range(levels[a]) for a in combo))}
+    fill_order = sorted(range(len(levels)), key=lambda a: -levels[a])
 
-        # override the two seeded axes:
-        if axis1 == 'price':
-            price = sample_uniform_in(b1)
-        elif axis1 == 'rating':
-            rating = sample_uniform_in(b1)
-        elif axis1 == 'distance':
-            distance = sample_uniform_in(b1)
-        else:  # axis1 == 'type'
-            typ = b1
+    rows = []
+    while uncovered:
+        combo, values = min(uncovered)
+        row = dict(zip(combo, values))
+        for axis in fill_order:
+            if axis in row:
+                continue
+            # Combinations the axis completes with the axes that are already set
+            completed = [c for c in combos if axis in c and all(a in row or a == axis for a in c)]
+            def gain(value):
+                row[axis] = value
+                return sum((c, tuple(row[a] for a in c)) in uncovered for c in completed)
+            row[axis] = max(range(levels[axis]), key=gain)
+        row = tuple(row[a] for a in range(len(levels)))
+        uncovered -= {(c, tuple(row[a] for a in c)) for c in combos}
+        rows.append(row)
+    return rows
 
-        if axis2 == 'price':
-            price = sample_uniform_in(b2)
-        elif axis2 == 'rating':
-            rating = sample_uniform_in(b2)
-        elif axis2 == 'distance':
-            distance = sample_uniform_in(b2)
-        else:  # axis2 == 'type'
-            typ = b2
+def coverage_stats(rows, levels, strength=2):
+    """How many of the `strength`-way bin combinations `rows` cover, against the full product."""
+    strength = min(strength, len(levels))
+    total = covered = 0
+    for combo in combinations(range(len(levels)), strength):
+        total += prod(levels[a] for a in combo)
+        covered += len({tuple(row[a] for a in combo) for row in rows})
+    return {
+        "strength": strength,
+        "rows": len(rows),
+        "product_rows": prod(levels),
+        "combinations": total,
+        "covered": covered,
+        "coverage": covered / total if total else 1.0,
+    }
+
+def coverage_records(axes, strength=2, start_id=1, count=None, rng=random):
+    """Seed one record per row of a covering array over `axes` (keys of bins.axis_bins), so
+    every `strength`-way combination of their bins appears in some record.
 
-        recs.append(_build_record(next_id, price, rating, distance, typ))
-        next_id += 1
+    Price, rating, distance and type get random values when they are not in `axes`;
+    any other axis in `axes` is written onto the records as an extra key. `count`
+    caps the number of records. Returns the records and their coverage_stats."""
+    bins = [axis_bins[axis] for axis in axes]
+    rows = covering_array([len(b) for b in bins], strength)[:count]
+
+    recs = []
+    for rec_id, row in enumerate(rows, start_id):
+        values = random_axis_values(rng)
+        # Override the seeded axes
+        for axis, axis_bin_defs, index in zip(axes, bins, row):
+            values[axis] = axis_value_in(axis_bin_defs[index], rng)
+        recs.append(_build_record(rec_id, rng=rng, **values))
 
-    return recs, next_id
+    return recs, coverage_stats(rows, [len(b) for b in bins], strength)
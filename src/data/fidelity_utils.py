@@ -0,0 +1,178 @@
+from collections import Counter, defaultdict
+
+import numpy as np
+from scipy.stats import chi2, kstwo
+
+from accom_utils import (dynamic_features_by_type, features_by_type,
+                         price_ranges, rating_ranges)
+from bulk_utils import DISTANCE_SEGMENTS
+
+# Values are compared in integer hundredths, the finest rounding the generator uses
+SCALE = 100
+
+# Smallest expected count of a chi-square cell, smaller cells are merged with their neighbours
+MIN_EXPECTED = 5
+
+
+def rounded_pmf(cdf, low, high, decimals):
+    """{value in hundredths: probability} of a continuous distribution on [low, high] rounded to `decimals`."""
+    step = 10 ** -decimals
+    values = np.round(np.arange(round(low / step), round(high / step) + 1) * step, decimals)
+    upper = np.clip(values + step / 2, low, high)
+    lower = np.clip(values - step / 2, low, high)
+    return {int(round(v * SCALE)): p for v, p in zip(values, cdf(upper) - cdf(lower))}
+
+
+def uniform_pmf(low, high, decimals=2):
+    return rounded_pmf(lambda x: (x - low) / (high - low), low, high, decimals)
+
+
+def triangular_high_pmf(low, high, decimals=2):
+    # random.triangular(low, high, mode=high), as generate_rating_by_type
+    return rounded_pmf(lambda x: ((x - low) / (high - low)) ** 2, low, high, decimals)
+
+
+def skewed_distance_pmf():
+    # generate_skewed_distance: a segment by probability, then a rounded uniform value inside it
+    pmf, previous = defaultdict(float), 0.0
+    for cumulative, low, high, decimals in DISTANCE_SEGMENTS:
+        for value, p in uniform_pmf(low, high, decimals).items():
+            pmf[value] += (cumulative - previous) * p
+        previous = cumulative
+    return dict(pmf)
+
+
+def dynamic_count_pmf(accom_type):
+    # generate_features: the number of dynamic features is uniform in [len - 6, len]
+    n = len(dynamic_features_by_type[accom_type])
+    counts = range(max(0, n - 6), n + 1)
+    return {count: 1 / len(counts) for count in counts}
+
+
+def chi_square(observed, pmf):
+    """Chi-square goodness of fit of a Counter against {value: probability}, merging
+    neighbouring cells (in value order) until each expects at least MIN_EXPECTED."""
+    n = sum(observed.values())
+    cells, observed_cell, expected_cell = [], 0, 0.0
+    for value in sorted(pmf):
+        observed_cell += observed.get(value, 0)
+        expected_cell += n * pmf[value]
+        if expected_cell >= MIN_EXPECTED:
+            cells.append((observed_cell, expected_cell))
+            observed_cell, expected_cell = 0, 0.0
+    if cells and expected_cell:
+        last_observed, last_expected = cells.pop()
+        cells.append((last_observed + observed_cell, last_expected + expected_cell))
+    if len(cells) < 2:
+        return None, None
+    statistic = sum((o - e) ** 2 / e for o, e in cells)
+    return statistic, chi2.sf(statistic, len(cells) - 1)
+
+
+def ks(observed, pmf):
+    """Kolmogorov-Smirnov distance between the empirical and the expected CDF over the
+    rounded values, and its p-value (conservative for a discrete distribution)."""
+    n = sum(observed.values())
+    if n == 0:
+        return None, None
+    values = sorted(pmf)
+    empirical = np.cumsum([observed.get(v, 0) for v in values]) / n
+    expected = np.cumsum([pmf[v] for v in values])
+    statistic = float(np.max(np.abs(empirical - expected)))
+    return statistic, float(kstwo.sf(statistic, n))
+
+
+class FidelityStats:
+    """Single-pass counts of a generated catalog, tested against the generator's specs.
+
+    Only counts per rounded value are kept, so memory does not grow with the
+    number of records. Checks are statistical (chi-square and KS, p-values)
+    or exact (values out of range, missing static or unknown features, which
+    must not occur).
+    """
+
+    def __init__(self):
+        self.records = 0
+        self.types = Counter()
+        self.distances = Counter()
+        self.prices = defaultdict(Counter)
+        self.ratings = defaultdict(Counter)
+        self.dynamic_counts = defaultdict(Counter)
+        self.missing_static = Counter()
+        self.unknown_features = Counter()
+
+    def add(self, record):
+        accom_type = record["type"]
+        self.records += 1
+        self.types[accom_type] += 1
+        self.distances[round(record["distance"] * SCALE)] += 1
+        self.prices[accom_type][round(record["price"] * SCALE)] += 1
+        self.ratings[accom_type][round(record["rating"] * SCALE)] += 1
+
+        features = set(record["features"])
+        static, dynamic = set(features_by_type.get(accom_type, [])), set(dynamic_features_by_type.get(accom_type, []))
+        self.dynamic_counts[accom_type][len(features & dynamic)] += 1
+        self.missing_static[accom_type] += bool(static - features)
+        self.unknown_features[accom_type] += bool(features - static - dynamic)
+
+    def results(self):
+        """One row per check: check, type, n, statistic and p_value (statistical) or violations (exact)."""
+        rows = []
+
+        def test(check, accom_type, observed, pmf):
+            n = sum(observed.values())
+            out_of_range = sum(count for value, count in observed.items() if value not in pmf)
+            rows.append({"check": f"{check} range", "type": accom_type, "n": n, "violations": out_of_range})
+            for name, (statistic, p) in (("chi2", chi_square(observed, pmf)), ("ks", ks(observed, pmf))):
+                if p is not None:
+                    rows.append({"check": f"{check} {name}", "type": accom_type, "n": n,
+                                 "statistic": statistic, "p_value": p})
+
+        uniform_types = {t: 1 / len(price_ranges) for t in price_ranges}
+        unknown_types = sum(count for t, count in self.types.items() if t not in uniform_types)
+        rows.append({"check": "type range", "type": "all", "n": self.records, "violations": unknown_types})
+        statistic, p = chi_square(self.types, uniform_types)
+        if p is not None:
+            rows.append({"check": "type chi2", "type": "all", "n": self.records, "statistic": statistic, "p_value": p})
+
+        distance_pmf = skewed_distance_pmf()
+        test("distance", "all", self.distances, distance_pmf)
+        # The 40/20/25/12/3 split between the distance segments, on its own (values on a
+        # boundary, such as 1.0, can come from either segment and count for the lower one)
+        segment_of = {}
+        for i, (_, low, high, decimals) in enumerate(DISTANCE_SEGMENTS):
+            for value in uniform_pmf(low, high, decimals):
+                segment_of.setdefault(value, i)
+        segments, split = Counter(), defaultdict(float)
+        for value, count in self.distances.items():
+            segments[segment_of.get(value, -1)] += count
+        for value, p in distance_pmf.items():
+            split[segment_of[value]] += p
+        statistic, p = chi_square(segments, split)
+        if p is not None:
+            rows.append({"check": "distance segments chi2", "type": "all", "n": self.records,
+                         "statistic": statistic, "p_value": p})
+
+        for accom_type in price_ranges:
+            if not self.types[accom_type]:
+                continue
+            test("price", accom_type, self.prices[accom_type], uniform_pmf(*price_ranges[accom_type]))
+            test("rating", accom_type, self.ratings[accom_type], triangular_high_pmf(*rating_ranges[accom_type]))
+            counts = self.dynamic_counts[accom_type]
+            # Dynamic feature counts are small integers, compare them in hundredths like the other values
+            test("dynamic features", accom_type, Counter({c * SCALE: n for c, n in counts.items()}),
+                 {c * SCALE: p for c, p in dynamic_count_pmf(accom_type).items()})
+            n = self.types[accom_type]
+            rows.append({"check": "static features", "type": accom_type, "n": n,
+                         "violations": self.missing_static[accom_type]})
+            rows.append({"check": "unknown features", "type": accom_type, "n": n,
+                         "violations": self.unknown_features[accom_type]})
+        return rows
+
+
+def failed_checks(rows, alpha=0.01):
+    """Rows that fail: any violation of an exact check, or a p-value below the
+    Bonferroni-corrected `alpha` over all statistical checks."""
+    n_tests = sum("p_value" in row for row in rows)
+    return [row for row in rows
+            if row.get("violations", 0) > 0 or ("p_value" in row and row["p_value"] < alpha / n_tests)]
@@ -1,68 +1,202 @@
-import json
+import argparse
+import os
 import random
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
 
 from accom_utils import (generate_accommodation_name, generate_features,
                          generate_images, generate_rating_by_type,
                          generate_skewed_distance, price_ranges,
                          random_location_at_distance)
-from coverage_utils import coverage_for_axes
+from bins import axis_bins
+from bulk_utils import generate_bulk, iter_records
+from coverage_utils import coverage_records, coverage_stats, covering_array
+from index_utils import BinIndex, FeatureIndex, ImageTable
+from writer_utils import FORMATS, write_dataset, write_manifest, write_shard
 
 # Total accommodations count to generate by this script
 TOTAL_COUNT=250
 
-axis_pairs = [
-    ('price','rating'),
-    ('price','distance'),
-    ('price','type'),
-    ('rating','distance'),
-    ('rating','type'),
-    ('distance','type'),
-]
-
-dataset, next_id = [], 1
-# Seed every combination of the six axis-pairs
-for axis1, axis2 in axis_pairs:
-    recs, next_id = coverage_for_axes(axis1, axis2, next_id)
-    needed = TOTAL_COUNT - len(dataset)
-    dataset.extend(recs[:needed])
-    if len(dataset) >= TOTAL_COUNT:
-        print("Warning: total count exceeded. Breaking the loop.")
-        break
-
-def build_random_accommodation(id: int) -> dict:
-    accom_type = random.choice(list(price_ranges.keys()))
+# Random records drawn per generate_bulk call, bounds memory in --bulk mode
+BULK_CHUNK_SIZE = 100_000
+
+# Axes seeded by the coverage records, and how many of them each bin combination spans
+coverage_axes = list(axis_bins)
+COVERAGE_STRENGTH = 2
+
+# Indexes that can be written alongside the dataset, by command-line option
+dataset_indexes = {
+    "index": BinIndex,
+    "features": FeatureIndex,
+}
+
+def build_random_accommodation(id: int, rng=random) -> dict:
+    accom_type = rng.choice(list(price_ranges.keys()))
     price_range = price_ranges[accom_type]
-    distance = generate_skewed_distance()
-    features = generate_features(accom_type)
+    distance = generate_skewed_distance(rng)
+    features = generate_features(accom_type, rng)
 
     return {
         "id": str(id),
         "versionBenchmark": {
-            "name": generate_accommodation_name(accom_type),
-            "location": random_location_at_distance(distance),
-            "images": generate_images(accom_type, features)},
+            "name": generate_accommodation_name(accom_type, rng),
+            "location": random_location_at_distance(distance, rng),
+            "images": generate_images(accom_type, features, rng)},
         "versionSingleAxisCarousel": {
-            "name": generate_accommodation_name(accom_type),
-            "location": random_location_at_distance(distance),
-            "images": generate_images(accom_type, features)},
+            "name": generate_accommodation_name(accom_type, rng),
+            "location": random_location_at_distance(distance, rng),
+            "images": generate_images(accom_type, features, rng)},
         "versionMultiAxisCarousel": {
-            "name": generate_accommodation_name(accom_type),
-            "location": random_location_at_distance(distance),
-            "images": generate_images(accom_type, features)},
-        "price": round(random.uniform(price_range[0], price_range[1]), 2),
-        "rating": generate_rating_by_type(accom_type),
+            "name": generate_accommodation_name(accom_type, rng),
+            "location": random_location_at_distance(distance, rng),
+            "images": generate_images(accom_type, features, rng)},
+        "price": round(rng.uniform(price_range[0], price_range[1]), 2),
+        "rating": generate_rating_by_type(accom_type, rng),
         "distance": distance,
         "type": accom_type,
         "features": features,
     }
 
-# Generate the rest of the dataset
-while len(dataset) < TOTAL_COUNT:
-    dataset.append( build_random_accommodation(next_id) )
-    next_id += 1
+# Helper to derive independent streams: 0 for the coverage records, shard + 1 for each shard
+def seed_stream(seed, stream):
+    return np.random.SeedSequence(seed, spawn_key=(stream,))
+
+# Helper to seed a `random.Random` (used by the per-record generators) from a seed stream
+def python_rng(seed_seq):
+    return random.Random(sum(int(word) << (32 * i) for i, word in enumerate(seed_seq.generate_state(4))))
+
+def iter_dataset(count, bulk=False, seed=None, shard=0, shard_size=None, strength=COVERAGE_STRENGTH):
+    """Yield the records of one shard of the dataset one by one.
+
+    The dataset is `count` records: coverage records in which every `strength`-way
+    combination of the coverage_axes bins appears, then random ones. It is cut
+    into shards of `shard_size` records (one shard by default), and every shard
+    draws from its own stream spawned from `seed`, so a shard is bit-for-bit
+    reproducible given (seed, shard_size) no matter which process generates it
+    or in which order. Pass the same integer seed to every shard.
+    """
+    shard_size = shard_size or count
+    start, stop = shard * shard_size, min((shard + 1) * shard_size, count)
+
+    # The coverage records come from a stream of their own, so any shard can rebuild its slice
+    coverage, _ = coverage_records(coverage_axes, strength, count=count, rng=python_rng(seed_stream(seed, 0)))
+    yield from coverage[start:stop]
+
+    # Generate the rest of the shard
+    next_id = max(start, len(coverage)) + 1
+    if bulk:
+        rng = np.random.default_rng(seed_stream(seed, shard + 1))
+        while next_id <= stop:
+            size = min(BULK_CHUNK_SIZE, stop - next_id + 1)
+            yield from iter_records(generate_bulk(size, start_id=next_id, rng=rng))
+            next_id += size
+    else:
+        rng = python_rng(seed_stream(seed, shard + 1))
+        while next_id <= stop:
+            yield build_random_accommodation(next_id, rng)
+            next_id += 1
+
+def _write_shard(task):
+    count, bulk, seed, shard, shard_size, strength, output_dir, fmt, factories = task
+    records = iter_dataset(count, bulk=bulk, seed=seed, shard=shard, shard_size=shard_size, strength=strength)
+    indexes = {name: factory() for name, factory in factories.items()}
+    for index in indexes.values():
+        records = index.track(records)
+    return write_shard(records, output_dir, shard, fmt), indexes
+
+def index_factories(args):
+    """The indexes to build alongside the dataset, by name, as requested on the command line."""
+    factories = {name: dataset_indexes[name] for name in dataset_indexes if getattr(args, name)}
+    if args.image_table or args.image_manifest:
+        factories["images"] = partial(ImageTable, intern=bool(args.image_table))
+    return factories
+
+def write_indexes(indexes, args):
+    for name, index in indexes.items():
+        if name in dataset_indexes:
+            index.write(getattr(args, name))
+    if "images" in indexes and args.image_table:
+        indexes["images"].write(args.image_table)
+    if "images" in indexes and args.image_manifest:
+        indexes["images"].write_manifest(args.image_manifest)
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the mock accommodation dataset.")
+    parser.add_argument("--count", type=int, default=TOTAL_COUNT,
+                        help=f"number of accommodations (default: {TOTAL_COUNT})")
+    parser.add_argument("--bulk", action="store_true",
+                        help="draw the random records as NumPy arrays in one go (for large catalogs)")
+    parser.add_argument("--strength", type=int, default=COVERAGE_STRENGTH,
+                        help=f"cover every combination of bins of this many axes (default: {COVERAGE_STRENGTH})")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="seed for a reproducible dataset (default: a fresh one, printed)")
+    parser.add_argument("--format", choices=list(FORMATS), default="pretty",
+                        help="pretty-printed JSON, compact JSON or NDJSON (default: pretty)")
+    parser.add_argument("--shard-size", type=int, default=None,
+                        help="write shards of this many records plus a manifest into the --output directory")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of processes generating shards in parallel (default: 1)")
+    parser.add_argument("--index", default=None,
+                        help="also write the record IDs per filter bin and the bin-pair counts to this JSON file")
+    parser.add_argument("--features", default=None,
+                        help="also write the feature dictionary, feature bitmasks and bitmaps to this JSON file")
+    parser.add_argument("--image-table", default=None,
+                        help="store images as positions in a shared table of image paths, written to this JSON file")
+    parser.add_argument("--image-manifest", default=None,
+                        help="also write the list of images the dataset references to this JSON file")
+    parser.add_argument("--output", default="/src/data/accommodationDataset.json",
+                        help="output JSON file, or directory with --shard-size (default: /src/data/accommodationDataset.json)")
+    args = parser.parse_args()
+    if args.shard_size is not None and args.shard_size < 1:
+        parser.error("--shard-size must be at least 1")
+    if args.seed is not None and args.seed < 0:
+        parser.error("--seed must be a non-negative integer")
+
+    seed = np.random.SeedSequence(args.seed).entropy
+    if args.seed is None:
+        print(f"Seed: {seed}")
+
+    # Report what the coverage records cover, and whether --count cuts them short
+    levels = [len(axis_bins[axis]) for axis in coverage_axes]
+    design = covering_array(levels, args.strength)
+    stats = coverage_stats(design[:args.count], levels, args.strength)
+    print(f"Coverage: {stats['covered']}/{stats['combinations']} {stats['strength']}-way bin combinations "
+          f"of {', '.join(coverage_axes)} in {stats['rows']} records (full product: {stats['product_rows']})")
+    if args.count < len(design):
+        print(f"Warning: --count {args.count} is below the {len(design)} coverage records, coverage is incomplete.")
+
+    factories = index_factories(args)
+
+    # Records are written as they are generated, the dataset is never held in memory
+    if not args.shard_size:
+        records = iter_dataset(args.count, bulk=args.bulk, seed=seed, strength=args.strength)
+        indexes = {name: factory() for name, factory in factories.items()}
+        for index in indexes.values():
+            records = index.track(records)
+        write_dataset(records, args.output, fmt=args.format)
+        write_indexes(indexes, args)
+        return
 
-# Save dataset
-with open("/src/data/accommodationDataset.json", "w") as f:
-    json.dump(dataset, f, indent=2)
+    os.makedirs(args.output, exist_ok=True)
+    n_shards = -(-args.count // args.shard_size)
+    tasks = [(args.count, args.bulk, seed, shard, args.shard_size, args.strength, args.output, args.format,
+              factories) for shard in range(n_shards)]
+    if args.workers > 1:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            results = list(pool.map(_write_shard, tasks))
+    else:
+        results = [_write_shard(task) for task in tasks]
+    shards = [entry for entry, _ in results]
+    # Shards hold consecutive ID ranges, so their indexes are merged in shard order
+    indexes = {name: factory() for name, factory in factories.items()}
+    for _, shard_indexes in results:
+        for name, index in indexes.items():
+            index.merge(shard_indexes[name])
+    write_indexes(indexes, args)
+    manifest = write_manifest(args.output, shards, args.format, seed=seed, shard_size=args.shard_size)
+    print(f"Saved {manifest['total']} accommodations in {len(shards)} shards to {args.output}")
 
-"/src/data/accommodationDataset.json"
+if __name__ == "__main__":
+    main()
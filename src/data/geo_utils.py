@@ -0,0 +1,62 @@
+import numpy as np
+
+# WGS-84 ellipsoid, as used by geopy's geodesic distance
+WGS84_A = 6378137.0
+WGS84_F = 1 / 298.257223563
+WGS84_E2 = WGS84_F * (2 - WGS84_F)
+
+
+def _radii(lat):
+    """Meridional and prime-vertical radii of curvature (m) at latitude `lat` (radians)."""
+    w = np.sqrt(1 - WGS84_E2 * np.sin(lat) ** 2)
+    return WGS84_A * (1 - WGS84_E2) / w ** 3, WGS84_A / w
+
+
+def destination_points(origin, distances_km, bearings_deg, iterations=3):
+    """Destinations (lat, lng in degrees) of arrays of (distance, initial bearing) from `origin`.
+
+    Closed-form Gauss mid-latitude solution of the direct geodesic problem:
+    the offset is projected with the radii of curvature and the azimuth at
+    the midpoint of the line, which is refined over a few iterations. Over
+    the 0-10 km the generator uses, this stays within millimetres of geopy's
+    geodesic `destination` (see max_deviation_from_geopy).
+    """
+    lat0, lng0 = np.radians(origin[0]), np.radians(origin[1])
+    distances = np.asarray(distances_km, dtype=float) * 1000
+    bearings = np.radians(bearings_deg)
+
+    dlat = dlng = np.zeros(np.broadcast(distances, bearings).shape)
+    for _ in range(iterations):
+        mid_lat = lat0 + dlat / 2
+        # The azimuth turns with the convergence of the meridians along the line
+        mid_bearing = bearings + dlng * np.sin(mid_lat) / 2
+        meridional, prime_vertical = _radii(mid_lat)
+        dlat = distances * np.cos(mid_bearing) / meridional
+        dlng = distances * np.sin(mid_bearing) / (prime_vertical * np.cos(mid_lat))
+    return np.degrees(lat0 + dlat), np.degrees(lng0 + dlng)
+
+
+def max_deviation_from_geopy(origin, max_km=10.0, samples=10_000, seed=0):
+    """Largest distance (m) between destination_points and geopy over random (distance, bearing) pairs."""
+    from geopy.distance import distance as geopy_distance
+    from geopy.distance import geodesic
+    from geopy.point import Point
+
+    rng = np.random.default_rng(seed)
+    distances = rng.uniform(0, max_km, samples)
+    bearings = rng.uniform(0, 360, samples)
+    lat, lng = destination_points(origin, distances, bearings)
+
+    start = Point(*origin)
+    deviation = 0.0
+    for i in range(samples):
+        expected = geopy_distance(kilometers=distances[i]).destination(start, bearings[i])
+        deviation = max(deviation, geodesic((expected.latitude, expected.longitude), (lat[i], lng[i])).m)
+    return deviation
+
+
+if __name__ == "__main__":
+    from accom_utils import valencia_center
+
+    deviation = max_deviation_from_geopy(valencia_center)
+    print(f"Max deviation from geopy over 0-10 km around Valencia: {deviation * 1000:.3f} mm")
@@ -0,0 +1,220 @@
+import base64
+import json
+import os
+from array import array
+from itertools import combinations
+
+import numpy as np
+
+from accom_utils import all_image_paths
+from bulk_utils import FEATURES, VARIANTS
+
+# Range hierarchies of the filters, shared with the UI (src/data/filterOptions/index.ts)
+FILTER_OPTIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "filterOptions")
+filter_option_files = {
+    "distance": "distanceRanges.json",
+    "price": "priceRanges.json",
+    "rating": "ratingRanges.json",
+    "type": "typeCategories.json",
+}
+
+
+def load_filter_options(directory=FILTER_OPTIONS_DIR):
+    """The range hierarchy of every filter axis, as in filterOptions/*.json."""
+    options = {}
+    for axis, file_name in filter_option_files.items():
+        with open(os.path.join(directory, file_name), encoding="utf-8") as f:
+            options[axis] = json.load(f)
+    return options
+
+
+def in_range(value, subrange):
+    """Whether a record value falls in a range, with the same rules as utils/filterUtils.ts:
+    ranges without bounds are categories matched by label, bounds are [lower, upper)."""
+    lower, upper = subrange.get("lowerBound"), subrange.get("upperBound")
+    if not lower and not upper:
+        return value == subrange["label"]
+    return (not lower or value >= lower) and (not upper or value < upper)
+
+
+class BinIndex:
+    """Sorted record IDs per bin, for every axis and every level of its range hierarchy,
+    plus record counts per pair of top-level bins of every two axes.
+
+    Bins are keyed by their path in the hierarchy ("0", "0.2", "0.2.1", ...); a record
+    is only indexed under a subrange if it also matches the parent range, as when
+    drilling down in the UI. Records must be added in increasing ID order.
+    """
+
+    def __init__(self, options=None):
+        self.options = load_filter_options() if options is None else options
+        self.ids = {axis: {} for axis in self.options}
+        self.labels = {axis: {} for axis in self.options}
+        for axis, ranges in self.options.items():
+            self._register(axis, ranges, "")
+        self.pairs = {(x, y): [[0] * len(self.options[y]) for _ in self.options[x]]
+                      for x, y in combinations(self.options, 2)}
+
+    def _register(self, axis, ranges, prefix):
+        for i, subrange in enumerate(ranges):
+            path = f"{prefix}{i}"
+            self.ids[axis][path] = array("q")
+            self.labels[axis][path] = subrange["label"]
+            self._register(axis, subrange.get("subranges", []), f"{path}.")
+
+    def _add_to_bins(self, axis, ranges, value, rec_id, prefix):
+        matched = []
+        for i, subrange in enumerate(ranges):
+            if in_range(value, subrange):
+                path = f"{prefix}{i}"
+                self.ids[axis][path].append(rec_id)
+                self._add_to_bins(axis, subrange.get("subranges", []), value, rec_id, f"{path}.")
+                matched.append(i)
+        return matched
+
+    def add(self, record):
+        rec_id = int(record["id"])
+        top = {axis: self._add_to_bins(axis, ranges, record[axis], rec_id, "")
+               for axis, ranges in self.options.items()}
+        for (x, y), counts in self.pairs.items():
+            for i in top[x]:
+                for j in top[y]:
+                    counts[i][j] += 1
+
+    def track(self, records):
+        """Yield the records unchanged, adding each one to the index on the way."""
+        for record in records:
+            self.add(record)
+            yield record
+
+    def merge(self, other):
+        """Append the index of records with higher IDs (e.g. the next shard) to this one."""
+        for axis, bins in other.ids.items():
+            for path, ids in bins.items():
+                self.ids[axis][path].extend(ids)
+        for pair, counts in other.pairs.items():
+            for row, other_row in zip(self.pairs[pair], counts):
+                row[:] = [a + b for a, b in zip(row, other_row)]
+        return self
+
+    def as_dict(self):
+        return {
+            "axes": {
+                axis: {path: {"label": self.labels[axis][path], "ids": ids.tolist()} for path, ids in bins.items()}
+                for axis, bins in self.ids.items()
+            },
+            "pairs": {f"{x},{y}": counts for (x, y), counts in self.pairs.items()},
+        }
+
+    def write(self, path):
+        with open(path, "w") as f:
+            json.dump(self.as_dict(), f, separators=(",", ":"))
+
+
+class FeatureIndex:
+    """Feature dictionary with a bitmask per record and a bitmap per feature.
+
+    Bit i of a record's mask is set when it has `features[i]` (the sorted
+    features of all types, see bulk_utils.FEATURES). The bitmap of a feature
+    has bit k (most significant bit first, as numpy.packbits) set when the k-th
+    record from `first_id` has it, so feature filters become bitwise ANDs over
+    the whole catalog. Records must be added with consecutive IDs.
+    """
+
+    def __init__(self, features=FEATURES):
+        self.features = list(features)
+        self.bits = {feature: 1 << i for i, feature in enumerate(self.features)}
+        self.first_id = None
+        self.masks = array("Q")
+
+    def add(self, record):
+        rec_id = int(record["id"])
+        if self.first_id is None:
+            self.first_id = rec_id
+        if rec_id != self.first_id + len(self.masks):
+            raise ValueError(f"Record {rec_id} does not follow record {self.first_id + len(self.masks) - 1}")
+        try:
+            self.masks.append(sum(self.bits[feature] for feature in record["features"]))
+        except KeyError as e:
+            raise ValueError(f"Record {rec_id} has a feature outside the dictionary: {e.args[0]!r}") from None
+
+    def track(self, records):
+        """Yield the records unchanged, adding each one to the index on the way."""
+        for record in records:
+            self.add(record)
+            yield record
+
+    def merge(self, other):
+        """Append the index of the records that directly follow (e.g. the next shard)."""
+        if other.first_id is not None:
+            if self.first_id is None:
+                self.first_id = other.first_id
+            elif other.first_id != self.first_id + len(self.masks):
+                raise ValueError(f"Records from {other.first_id} do not follow record {self.first_id + len(self.masks) - 1}")
+            self.masks.extend(other.masks)
+        return self
+
+    def as_dict(self):
+        masks = np.frombuffer(self.masks, dtype=np.uint64) if self.masks else np.zeros(0, dtype=np.uint64)
+        return {
+            "features": self.features,
+            "first_id": self.first_id,
+            "count": len(self.masks),
+            "masks": self.masks.tolist(),
+            "bitmaps": {
+                feature: base64.b64encode(np.packbits((masks >> np.uint64(i)) & np.uint64(1))).decode("ascii")
+                for i, feature in enumerate(self.features)
+            },
+        }
+
+    def write(self, path):
+        with open(path, "w") as f:
+            json.dump(self.as_dict(), f, separators=(",", ":"))
+
+
+class ImageTable:
+    """Shared table of image paths, and which of them the records reference.
+
+    The table lists every path generate_images can produce in a fixed order
+    (accom_utils.all_image_paths), so separately generated shards agree on it.
+    With `intern`, the image paths of every interface variant of a record are
+    replaced by their positions in the table.
+    """
+
+    def __init__(self, paths=None, intern=True):
+        self.paths = all_image_paths() if paths is None else list(paths)
+        self.positions = {path: i for i, path in enumerate(self.paths)}
+        self.intern = intern
+        self.referenced = bytearray(len(self.paths))
+
+    def _position(self, path):
+        try:
+            position = self.positions[path]
+        except KeyError:
+            raise ValueError(f"Image outside the image table: {path!r}") from None
+        self.referenced[position] = 1
+        return position
+
+    def track(self, records):
+        """Yield the records, with image positions instead of paths if interning."""
+        for record in records:
+            for variant in VARIANTS:
+                positions = [self._position(path) for path in record[variant]["images"]]
+                if self.intern:
+                    record[variant]["images"] = positions
+            yield record
+
+    def merge(self, other):
+        """Add the images referenced by another shard."""
+        self.referenced = bytearray(a | b for a, b in zip(self.referenced, other.referenced))
+        return self
+
+    def write(self, path):
+        """Write the table: the path of every image position."""
+        with open(path, "w") as f:
+            json.dump(self.paths, f, indent=2)
+
+    def write_manifest(self, path):
+        """Write the paths of the images the records reference, e.g. for preloading."""
+        with open(path, "w") as f:
+            json.dump([p for p, used in zip(self.paths, self.referenced) if used], f, indent=2)
@@ -0,0 +1,50 @@
+import argparse
+import sys
+from itertools import islice
+
+from bins import axis_bins
+from coverage_utils import covering_array
+from fidelity_utils import FidelityStats, failed_checks
+from generate_accommodation_dataset import COVERAGE_STRENGTH, coverage_axes
+from writer_utils import read_records
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check that a generated dataset follows the generator's distributions (exit code 1 if not).")
+    parser.add_argument("dataset", help="JSON or NDJSON dataset, or a directory of shards")
+    parser.add_argument("--strength", type=int, default=COVERAGE_STRENGTH,
+                        help="coverage strength the dataset was generated with; its coverage records are skipped "
+                             f"since their values are drawn from bins (default: {COVERAGE_STRENGTH})")
+    parser.add_argument("--skip", type=int, default=None,
+                        help="number of leading records to skip instead of the coverage records of --strength")
+    parser.add_argument("--alpha", type=float, default=0.01,
+                        help="family-wise significance level of the statistical checks (default: 0.01)")
+    args = parser.parse_args()
+
+    skip = args.skip
+    if skip is None:
+        skip = len(covering_array([len(axis_bins[axis]) for axis in coverage_axes], args.strength))
+    stats = FidelityStats()
+    for record in islice(read_records(args.dataset), skip, None):
+        stats.add(record)
+
+    rows = stats.results()
+    failed = failed_checks(rows, args.alpha)
+    print(f"{stats.records} records checked (first {skip} coverage records skipped)")
+    for row in rows:
+        status = "FAIL" if any(row is f for f in failed) else "ok"
+        if "p_value" in row:
+            detail = f"statistic={row['statistic']:.4g} p={row['p_value']:.3g}"
+        else:
+            detail = f"violations={row['violations']}"
+        print(f"  {status:<4} {row['check']:<24} {row['type']:<36} n={row['n']:<9} {detail}")
+
+    if failed:
+        print(f"FAILED: {len(failed)} of {len(rows)} checks diverge from the generator's specs", file=sys.stderr)
+        sys.exit(1)
+    print(f"All {len(rows)} checks passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import json
+import os
+
+try:
+    import ijson
+except ImportError:  # JSON arrays are then loaded in full
+    ijson = None
+
+# Output formats: "pretty" matches json.dump(..., indent=2), "json" is a compact array
+# and "ndjson" is one compact record per line
+FORMATS = {"pretty": ".json", "json": ".json", "ndjson": ".ndjson"}
+
+MANIFEST_NAME = "manifest.json"
+
+
+def _dumps(record):
+    return json.dumps(record, separators=(",", ":"))
+
+
+def write_records(records, f, fmt="pretty"):
+    """Write records to the open text file `f` one at a time; returns the number written."""
+    count = 0
+    if fmt == "ndjson":
+        for record in records:
+            f.write(_dumps(record))
+            f.write("\n")
+            count += 1
+        return count
+
+    pretty = fmt == "pretty"
+    for record in records:
+        if pretty:
+            # Same layout as json.dump of the whole list with indent=2
+            text = json.dumps(record, indent=2).replace("\n", "\n  ")
+            f.write(("[\n  " if count == 0 else ",\n  ") + text)
+        else:
+            f.write(("[" if count == 0 else ",") + _dumps(record))
+        count += 1
+    if count == 0:
+        f.write("[]")
+    else:
+        f.write("\n]" if pretty else "]")
+    return count
+
+
+def write_dataset(records, path, fmt="pretty"):
+    """Stream records into a single file at `path`; returns the number written."""
+    with open(path, "w") as f:
+        return write_records(records, f, fmt)
+
+
+def shard_name(index, fmt="json"):
+    return f"accommodations-{index:05d}{FORMATS[fmt]}"
+
+
+def write_shard(records, output_dir, index, fmt="json"):
+    """Stream records into shard `index` of `output_dir`; returns its manifest entry."""
+    name = shard_name(index, fmt)
+    first = last = None
+
+    def track(records):
+        nonlocal first, last
+        for record in records:
+            first = record if first is None else first
+            last = record
+            yield record
+
+    count = write_dataset(track(records), os.path.join(output_dir, name), fmt)
+    return {"path": name, "count": count,
+            "first_id": first["id"] if first else None, "last_id": last["id"] if last else None}
+
+
+def write_manifest(output_dir, shards, fmt="json", **extra):
+    """Write manifest.json listing the shard entries of write_shard; returns the manifest."""
+    manifest = {"format": fmt, "total": sum(shard["count"] for shard in shards), **extra, "shards": shards}
+    with open(os.path.join(output_dir, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def read_records(path):
+    """Yield the records of a dataset written by this module: a JSON or NDJSON file, or a
+    directory of shards with a manifest. NDJSON is read line by line and JSON arrays are
+    streamed with ijson when it is installed, so memory stays flat."""
+    if os.path.isdir(path):
+        with open(os.path.join(path, MANIFEST_NAME)) as f:
+            manifest = json.load(f)
+        for shard in manifest["shards"]:
+            yield from read_records(os.path.join(path, shard["path"]))
+    elif path.endswith(FORMATS["ndjson"]):
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    elif ijson is not None:
+        with open(path, "rb") as f:
+            # Floats as floats (not Decimal), like json.load
+            yield from ijson.items(f, "item", use_float=True)
+    else:
+        with open(path) as f:
+            yield from json.load(f)